@@ -0,0 +1 @@
+"""Benchmarks of the report pipeline on synthetic Smartabase payloads (python -m benchmarks.run)."""
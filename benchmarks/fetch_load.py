@@ -0,0 +1,105 @@
+"""
+Load test of the report fetch against the local stand-in.
+
+Starts a stand-in server (benchmarks.standin) in this process, or uses
+--url, and runs --requests fetch_report() calls, --concurrency at a
+time, each downloading and parsing one week. For every call it keeps
+the wall time, the parsed rows and the exception class on failure,
+then prints the success count, the failures by type, the wall-time
+percentiles and the outcomes of the client's HTTP attempts (retries and
+resumed bodies included, see trainingplan.fetch).
+
+    python -m benchmarks.fetch_load --requests 20 --concurrency 4 --latency 0.2 --fail-rate 0.2
+    python -m benchmarks.fetch_load --cache-ttl 0   # shared payload cache, revalidated on every call
+"""
+import argparse
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+
+from benchmarks.standin import FAILURE_MODES, start_server, synthetic_payload
+from trainingplan.pipeline import week_end
+from trainingplan.smartabase import fetch_report, report_client
+
+
+def fetch_once(url, week, cache_dir, cache_ttl):
+    """One fetch of `week`; returns (wall seconds, rows, exception class name or None)."""
+    started = time.perf_counter()
+    try:
+        data = fetch_report(url=url, start_date=week, end_date=week_end(week),
+                            cache_dir=cache_dir, cache_ttl=cache_ttl)
+    except Exception as error:  # counted by type, the load test goes on
+        return time.perf_counter() - started, 0, type(error).__name__
+    return time.perf_counter() - started, len(data), None
+
+
+def run_load(url, week, requests=20, concurrency=4, cache_dir=None, cache_ttl=0):
+    """
+    Run `requests` fetches, `concurrency` at a time.
+    :return: list of (wall, rows, error), one per fetch
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(fetch_once, url, week, cache_dir, cache_ttl) for _ in range(requests)]
+        return [future.result() for future in futures]
+
+
+def summary(results, elapsed):
+    walls = np.array([wall for wall, _, error in results if error is None])
+    errors = Counter(error for _, _, error in results if error is not None)
+    lines = [f"{len(results)} fetches in {elapsed:.2f} s: {len(walls)} ok, {sum(errors.values())} failed"]
+    lines += [f"  {name}: {count}" for name, count in errors.most_common()]
+    if len(walls):
+        p50, p95 = np.percentile(walls, [50, 95])
+        lines.append(f"wall per successful fetch: p50 {p50:.3f} s, p95 {p95:.3f} s, max {walls.max():.3f} s")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the report fetch against a local stand-in.")
+    parser.add_argument("--url", default=None, help="report URL of a running stand-in (default: start one here)")
+    parser.add_argument("--week", type=date.fromisoformat, default=None,
+                        help="Sunday of the week fetched (default: the current week)")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--cache-ttl", type=int, default=None,
+                        help="use one shared payload cache with this TTL (default: no cache, always download)")
+    parser.add_argument("--scale", type=float, default=1, help="synthetic payload size, times today's sessions per day")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=float, default=None, help="MB/s")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--failures", nargs="+", choices=FAILURE_MODES, default=["503", "reset"])
+    parser.add_argument("--stall", type=float, default=30.0)
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args(argv)
+
+    week = args.week or date.today() - timedelta(days=(date.today().weekday() + 1) % 7)
+    server = None
+    url = args.url
+    if url is None:
+        server = start_server(
+            synthetic_payload(args.scale), latency=args.latency,
+            bandwidth=args.bandwidth * 1e6 if args.bandwidth else None, fail_rate=args.fail_rate,
+            failures=args.failures, stall=args.stall, use_gzip=args.gzip,
+        )
+        url = server.url
+        print(f"Stand-in at {url} ({len(server.payload) / 1e6:.1f} MB)")
+
+    cache_dir = tempfile.mkdtemp(prefix="trainingplan-fetch-") if args.cache_ttl is not None else None
+    started = time.perf_counter()
+    results = run_load(url, week, args.requests, args.concurrency, cache_dir, args.cache_ttl or 0)
+    print(summary(results, time.perf_counter() - started))
+    attempts = report_client().attempts
+    outcomes = Counter(str(a.error or a.status) for a in attempts)
+    print(f"attempts (last {len(attempts)}): " + ", ".join(f"{name} {count}" for name, count in outcomes.most_common()))
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+        print("server: " + ", ".join(f"{key} {value}" for key, value in sorted(server.stats.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Pipeline benchmark on synthetic Smartabase payloads.
+
+For every scale (1x, 10x and 100x today's sessions per day by default) a
+synthetic report is written to disk (see benchmarks.synthetic) and one
+week of it goes through the same code as the app, stage by stage:
+
+    parse      streaming HTML parse of the report, limited to the week
+    convert    UTC milliseconds -> local 'HH:MM' (add_local_times)
+    clean      clean_report plus the calendar filters
+    pivot      session_pivot
+    excel      render_calendar (template fill)
+    venue_doc  venue_usage_report
+    occupancy  max_occupancy_report
+
+Each scale runs in a fresh process so peak memory is its own, and each
+stage keeps its fastest of --repeat runs. Results are compared with
+benchmarks/baseline.json; stages at least REGRESSION_RATIO (and more
+than NOISE_SECONDS) slower than the baseline are flagged, and make
+--check exit with status 1.
+
+    python -m benchmarks.run                   # 1x, 10x, 100x against the baseline
+    python -m benchmarks.run --scales 1 10 --repeat 5
+    python -m benchmarks.run --sports 30 --venues 40 --weeks 52   # a bigger report shape
+    python -m benchmarks.run --save-baseline   # store this machine's results as the baseline
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from benchmarks.synthetic import BASE_SPEC, scaled, write_payload
+from trainingplan.instrument import REGRESSION_RATIO, Stage
+from trainingplan.template import EXCEL_WRITER
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+STAGES = ['parse', 'convert', 'clean', 'pivot', 'excel', 'venue_doc', 'occupancy']
+READ_CHUNK_BYTES = 64 * 1024
+# Differences below this are timer noise, whatever the ratio.
+NOISE_SECONDS = 0.005
+# SyntheticSpec fields settable from the command line; --scales multiplies sessions_per_day.
+SPEC_FIELDS = ['sports', 'groups_per_sport', 'venues', 'sessions_per_day', 'weeks', 'seed']
+
+
+def _file_chunks(path):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _measure(results, name, function, *args, rows=len):
+    record = Stage(name)
+    record.start()
+    value = function(*args)
+    record.stop()
+    record.rows = rows(value) if rows is not None else None
+    best = results.get(name)
+    if best is None or record.wall < best["wall"]:
+        results[name] = record.as_dict()
+    return value
+
+
+def run_scale(path, week, repeat=3):
+    """
+    Time every stage on the payload at `path` for the week starting on `week`.
+    :return: {stage: {"wall", "cpu", "peak_rss", "rss_growth", "rows"}} (fastest of `repeat` runs)
+    """
+    from trainingplan.layout import CALENDAR_LAYOUT
+    from trainingplan.pipeline import filter_week, week_end
+    from trainingplan.reports import max_occupancy_report, venue_usage_report
+    from trainingplan.sessions import DAY_ORDER, session_pivot
+    from trainingplan.smartabase import clean_report, read_report
+    from trainingplan.template import render_calendar
+    from trainingplan.times import add_local_times
+
+    def convert(data):
+        renamed = data.rename(columns=lambda c: str(c).replace(' ', '_'))
+        return add_local_times(renamed)
+
+    def clean(data):
+        return filter_week(clean_report(data), week)
+
+    results = {}
+    for _ in range(repeat):
+        data = _measure(results, "parse", lambda: read_report(_file_chunks(path), start_date=week,
+                                                              end_date=week_end(week)))
+        _measure(results, "convert", convert, data)
+        filtered_df = _measure(results, "clean", clean, data)
+        pivot_df = _measure(results, "pivot", session_pivot, filtered_df, DAY_ORDER)
+        _measure(results, "excel", render_calendar, pivot_df, CALENDAR_LAYOUT, week, rows=None)
+        _measure(results, "venue_doc", venue_usage_report, filtered_df, week, CALENDAR_LAYOUT, rows=None)
+        _measure(results, "occupancy", max_occupancy_report, filtered_df, week, CALENDAR_LAYOUT, rows=None)
+    return results
+
+
+def _spec_dict(spec):
+    return dict(spec._asdict(), first_sunday=spec.first_sunday.isoformat())
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def report(scale, results, baseline_results):
+    """Table of one scale's stages next to the baseline; returns the stages flagged as slower."""
+    slower = []
+    print(f"{'stage':<11} {'wall s':>9} {'cpu s':>9} {'peak MB':>8} {'rows':>9} {'baseline':>9} {'ratio':>6}")
+    for name in STAGES:
+        result = results[name]
+        line = (f"{name:<11} {result['wall']:>9.4f} {result['cpu']:>9.4f} "
+                f"{result['peak_rss'] or 0:>8.0f} {result['rows'] if result['rows'] is not None else '':>9}")
+        before = (baseline_results or {}).get(name)
+        if before:
+            ratio = result['wall'] / before['wall'] if before['wall'] else float('inf')
+            line += f" {before['wall']:>9.4f} {ratio:>6.2f}"
+            if ratio >= REGRESSION_RATIO and result['wall'] - before['wall'] >= NOISE_SECONDS:
+                line += "  SLOWER"
+                slower.append(f"{scale:g}x {name}")
+        print(line)
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the report pipeline on synthetic payloads.")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100],
+                        help="multiples of today's sessions per day")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scale; the fastest run of each stage is kept")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare with / save to")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 when a stage is slower than the baseline")
+    parser.add_argument("--payload-dir", default=None, help="keep the synthetic payloads here (default: a temp dir)")
+    for field in SPEC_FIELDS:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, default=None,
+                            help=f"synthetic spec {field} at 1x (default: {getattr(BASE_SPEC, field)})")
+    args = parser.parse_args(argv)
+
+    base_spec = BASE_SPEC._replace(**{
+        field: getattr(args, field) for field in SPEC_FIELDS if getattr(args, field) is not None
+    })
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+    elif baseline.get("spec") != _spec_dict(base_spec):
+        print("Warning: the baseline was measured on a different synthetic spec.")
+    elif baseline.get("writer", EXCEL_WRITER) != EXCEL_WRITER:
+        print(f"Warning: the baseline's excel stage used the {baseline['writer']} writer, not {EXCEL_WRITER}.")
+
+    week = base_spec.first_sunday + timedelta(weeks=base_spec.weeks // 2)
+    payload_dir = args.payload_dir or tempfile.mkdtemp(prefix="trainingplan-bench-")
+    os.makedirs(payload_dir, exist_ok=True)
+    scales = {}
+    slower = []
+    for scale in args.scales:
+        spec = scaled(base_spec, scale)
+        path = os.path.join(payload_dir, f"payload_{spec.sports}s{spec.groups_per_sport}g{spec.venues}v_"
+                                         f"{spec.sessions_per_day}x{spec.weeks * 7}_seed{spec.seed}.html")
+        if not os.path.exists(path):
+            write_payload(spec, path)
+        size = os.path.getsize(path)
+        print(f"\n{scale:g}x: {spec.sports} sports x {spec.groups_per_sport} groups, {spec.venues} venues, "
+              f"{spec.sessions_per_day} sessions/day, {spec.weeks} weeks of history, "
+              f"{size / 1e6:.1f} MB payload, week of {week:%d %b %Y}")
+        # A fresh process per scale, so peak memory belongs to this scale alone.
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = pool.submit(run_scale, path, week, args.repeat).result()
+        scales[f"{scale:g}"] = results
+        slower += report(scale, results, (baseline or {}).get("scales", {}).get(f"{scale:g}"))
+        if not args.payload_dir:
+            os.remove(path)
+    if not args.payload_dir:
+        os.rmdir(payload_dir)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "spec": _spec_dict(base_spec),
+                "writer": EXCEL_WRITER,
+                "python": platform.python_version(),
+                "machine": platform.platform(),
+                "repeat": args.repeat,
+                "scales": scales,
+            }, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    if slower:
+        print(f"\nSlower than the baseline (ratio >= {REGRESSION_RATIO}): {', '.join(slower)}")
+    if args.check and slower:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
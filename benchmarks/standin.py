@@ -0,0 +1,233 @@
+"""
+Local stand-in for the Smartabase report endpoint.
+
+Serves a recorded report (--payload) or a synthetic one (see
+benchmarks.synthetic) at the live report's path, so fetching, streaming
+parsing and the payload cache can be exercised and load-tested without
+the real server:
+
+* basic auth with the report credentials (401 otherwise);
+* ETag / Last-Modified, answering conditional requests with 304;
+* a gzip-encoded body for clients that accept it (--gzip);
+* configurable time to first byte (--latency) and transfer rate (--bandwidth);
+* a fraction of requests (--fail-rate) failing as one of FAILURE_MODES:
+  503    "Service Unavailable" before any body
+  reset  the connection is closed half way through the body
+  stall  the headers are sent, then nothing for --stall seconds
+
+    python -m benchmarks.standin --scale 10 --latency 0.5 --fail-rate 0.1
+    TRAININGPLAN_REPORT_URL=http://127.0.0.1:8765/aspireacademy/live?report=PYTHON6_TRAINING_PLAN&updategroup=true \\
+        python -m trainingplan build --out reports/
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from benchmarks.synthetic import BASE_SPEC, iter_payload, scaled
+from trainingplan.smartabase import LIVE_REPORT_URL, REPORT_AUTH
+
+FAILURE_MODES = ["503", "reset", "stall"]
+WRITE_CHUNK_BYTES = 64 * 1024
+# History weeks after the current one in the default synthetic payload.
+WEEKS_AHEAD = 4
+
+
+def synthetic_payload(scale=1, first_sunday=None, seed=0):
+    """
+    Synthetic report bytes at `scale` times today's volume.
+    :param first_sunday: first week of the history; by default the current week is WEEKS_AHEAD weeks from its end
+    """
+    spec = scaled(BASE_SPEC, scale)
+    if first_sunday is None:
+        this_week = date.today() - timedelta(days=(date.today().weekday() + 1) % 7)
+        first_sunday = this_week - timedelta(weeks=spec.weeks - WEEKS_AHEAD)
+    return b"".join(iter_payload(spec._replace(first_sunday=first_sunday, seed=seed)))
+
+
+class StandInServer(ThreadingHTTPServer):
+    """HTTP server holding the payload, the behaviour settings and request counters."""
+
+    daemon_threads = True
+
+    def __init__(self, address, payload, auth=REPORT_AUTH, latency=0.0, bandwidth=None, fail_rate=0.0,
+                 failures=("503", "reset"), stall=30.0, use_gzip=False, seed=0, verbose=False):
+        super().__init__(address, ReportHandler)
+        self.payload = payload
+        self.gzipped = gzip.compress(payload, compresslevel=6) if use_gzip else None
+        self.etag = '"%s"' % hashlib.sha256(payload).hexdigest()[:32]
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self.authorization = "Basic " + base64.b64encode(":".join(auth).encode()).decode()
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.fail_rate = fail_rate
+        self.failures = list(failures)
+        self.stall = stall
+        self.verbose = verbose
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        """Report URL on this server (same path and query as the live report)."""
+        live = urlsplit(LIVE_REPORT_URL)
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{live.path}?{live.query}"
+
+    def draw_failure(self):
+        """Failure mode for the next request, or None."""
+        with self._lock:
+            if self.failures and self._rng.random() < self.fail_rate:
+                return self._rng.choice(self.failures)
+        return None
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+
+class ReportHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the live server, so pooled clients reuse connections.
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _write_body(self, body, limit=None):
+        # Paced writes when a bandwidth (bytes per second) is set.
+        end = len(body) if limit is None else limit
+        for offset in range(0, end, WRITE_CHUNK_BYTES):
+            chunk = body[offset:min(offset + WRITE_CHUNK_BYTES, end)]
+            self.wfile.write(chunk)
+            self.server.count("bytes", len(chunk))
+            if self.server.bandwidth:
+                time.sleep(len(chunk) / self.server.bandwidth)
+
+    def do_GET(self):
+        server = self.server
+        server.count("requests")
+        if urlsplit(self.path).path != urlsplit(LIVE_REPORT_URL).path:
+            server.count("404")
+            self._send(404, b"Not found")
+            return
+        if self.headers.get("Authorization") != server.authorization:
+            server.count("401")
+            self._send(401, b"Unauthorized", {"WWW-Authenticate": 'Basic realm="smartabase"'})
+            return
+
+        failure = server.draw_failure()
+        if server.latency:
+            time.sleep(server.latency)
+        if failure == "503":
+            server.count("failure.503")
+            self._send(503, b"Service Unavailable", {"Retry-After": "1"})
+            return
+        if self.headers.get("If-None-Match") == server.etag:
+            server.count("304")
+            self._send(304, headers={"ETag": server.etag})
+            return
+
+        accepts_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        body = server.gzipped if server.gzipped is not None and accepts_gzip else server.payload
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", server.etag)
+        self.send_header("Last-Modified", server.last_modified)
+        if body is server.gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        try:
+            if failure == "stall":
+                server.count("failure.stall")
+                self.wfile.flush()
+                time.sleep(server.stall)
+            if failure == "reset":
+                server.count("failure.reset")
+                self._write_body(body, limit=len(body) // 2)
+                self.wfile.flush()
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+                return
+            self._write_body(body)
+            server.count("200")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. its read timeout during a stall).
+            server.count("client_disconnects")
+            self.close_connection = True
+
+
+def start_server(payload, host="127.0.0.1", port=0, **options):
+    """
+    Serve `payload` from a background thread.
+    :param port: 0 picks a free port (see server.url)
+    :param options: StandInServer settings (latency, bandwidth, fail_rate, failures, stall, use_gzip, ...)
+    :return: StandInServer; call shutdown() when done
+    """
+    server = StandInServer((host, port), payload, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a Smartabase report stand-in on localhost.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--payload", default=None, help="recorded report HTML to serve (default: synthetic)")
+    parser.add_argument("--scale", type=float, default=1, help="synthetic payload size, times today's sessions per day")
+    parser.add_argument("--first-sunday", type=date.fromisoformat, default=None,
+                        help="first week of the synthetic history (default: the current week is near its end)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--bandwidth", type=float, default=None, help="transfer rate in MB/s (default: unlimited)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of report requests that fail")
+    parser.add_argument("--failures", nargs="+", choices=FAILURE_MODES, default=["503", "reset"],
+                        help="failure modes to draw from")
+    parser.add_argument("--stall", type=float, default=30.0, help="seconds a stalled response waits before the body")
+    parser.add_argument("--gzip", action="store_true", help="send the body gzip-encoded to clients that accept it")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic payload and the failure draws")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    if args.payload:
+        with open(args.payload, "rb") as f:
+            payload = f.read()
+    else:
+        payload = synthetic_payload(args.scale, args.first_sunday, args.seed)
+    server = StandInServer(
+        (args.host, args.port), payload, latency=args.latency,
+        bandwidth=args.bandwidth * 1e6 if args.bandwidth else None, fail_rate=args.fail_rate,
+        failures=args.failures, stall=args.stall, use_gzip=args.gzip, seed=args.seed, verbose=args.verbose,
+    )
+    print(f"Serving {len(payload) / 1e6:.1f} MB report at {server.url}")
+    print(f"  TRAININGPLAN_REPORT_URL='{server.url}'")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("\n" + ", ".join(f"{key}: {value}" for key, value in sorted(server.stats.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Synthetic PYTHON6_TRAINING_PLAN payloads.
+
+write_payload() produces an HTML table shaped like the Smartabase report
+(same header, dd/mm/yyyy dates, UTC millisecond start/finish times, a
+few blank cells, competitions, training camps and duplicate rows) from
+a SyntheticSpec, so the pipeline can be measured without the live
+endpoint. Sports and training groups start with the ones in the
+calendar layout, so the Excel fill finds data, and are padded with
+generated names when the spec asks for more.
+
+    python -m benchmarks.synthetic --scale 10 --out payload.html
+"""
+import argparse
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from trainingplan.layout import CALENDAR_LAYOUT
+
+SyntheticSpec = namedtuple(
+    'SyntheticSpec', ['sports', 'groups_per_sport', 'venues', 'sessions_per_day', 'weeks', 'first_sunday', 'seed']
+)
+SyntheticSpec.__doc__ = """
+Shape of a synthetic report.
+sports / groups_per_sport / venues: how many distinct values of each.
+sessions_per_day: sessions generated for every day of the history.
+weeks: weeks of history, starting on first_sunday.
+seed: random seed, the same spec always gives the same payload.
+"""
+
+# Roughly today's report: the layout's 14 sports, a term and a half of history.
+BASE_SPEC = SyntheticSpec(
+    sports=14, groups_per_sport=3, venues=20, sessions_per_day=60, weeks=26,
+    first_sunday=date(2025, 1, 5), seed=0,
+)
+
+HEADER = ['About', 'Sport', 'Training Group', 'Date', 'AM/PM', 'Day AM/PM', 'Venue',
+          'Start Time', 'Finish Time', 'Session Type', 'Coach']
+SESSION_TYPES = ['Training'] * 16 + ['Competition', 'Training Camp', '']
+DURATIONS = [30, 45, 60, 90, 120]
+OFFSET_HOURS = 11  # the report's UTC times are local time minus 11 hours
+ROWS_PER_WRITE = 20000
+
+
+def scaled(spec, factor):
+    """`spec` with factor times the sessions per day (1x, 10x, 100x today's volume)."""
+    return spec._replace(sessions_per_day=int(round(spec.sessions_per_day * factor)))
+
+
+def groups(spec):
+    """(sport, training_group) pairs of the spec, layout groups first."""
+    by_sport = {}
+    for row in CALENDAR_LAYOUT:
+        by_sport.setdefault(row["sport"], []).append(row["training_group"])
+    sports = list(by_sport)[:spec.sports]
+    sports += [f"Sport {i}" for i in range(len(sports) + 1, spec.sports + 1)]
+    pairs = []
+    for sport in sports:
+        names = by_sport.get(sport, [])[:spec.groups_per_sport]
+        names += [f"{sport} Group {i}" for i in range(len(names) + 1, spec.groups_per_sport + 1)]
+        pairs.extend((sport, name) for name in names)
+    return pairs
+
+
+def _rows(spec, day, rng, pairs, venues):
+    n = spec.sessions_per_day
+    pick = rng.integers(len(pairs), size=n)
+    start_local = rng.integers(5 * 4, 21 * 4, size=n) * 15  # quarter hours, 05:00-21:00
+    duration = rng.choice(DURATIONS, size=n)
+    midnight_utc = datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp() * 1000
+    start_ms = (midnight_utc + (start_local + OFFSET_HOURS * 60) * 60000).astype(np.int64)
+    finish_ms = start_ms + duration * 60000
+    venue = rng.integers(len(venues), size=n)
+    session_type = rng.integers(len(SESSION_TYPES), size=n)
+    blank = rng.random(size=(n, 3)) < 0.02  # venue, times, AM/PM
+
+    date_text = day.strftime('%d/%m/%Y')
+    weekday = day.strftime('%A')
+    for i in range(n):
+        sport, group = pairs[pick[i]]
+        am_pm = '' if blank[i, 2] else ('AM' if start_local[i] < 12 * 60 else 'PM')
+        times = ('', '') if blank[i, 1] else (start_ms[i], finish_ms[i])
+        yield (f"<tr><td></td><td>{sport}</td><td>{group}</td><td>{date_text}</td><td>{am_pm}</td>"
+               f"<td>{weekday} {am_pm}</td><td>{'' if blank[i, 0] else venues[venue[i]]}</td>"
+               f"<td>{times[0]}</td><td>{times[1]}</td><td>{SESSION_TYPES[session_type[i]]}</td>"
+               f"<td>Coach {pick[i] % 7}</td></tr>")
+
+
+def iter_payload(spec):
+    """The synthetic report as a stream of bytes chunks."""
+    rng = np.random.default_rng(spec.seed)
+    pairs = groups(spec)
+    venues = [f"Venue {i}" for i in range(1, spec.venues + 1)]
+    header = "".join(f"<th>{name}</th>" for name in HEADER)
+    yield f"<html><body><table><thead><tr>{header}</tr></thead><tbody>".encode()
+
+    buffer = []
+    for day_offset in range(spec.weeks * 7):
+        day = spec.first_sunday + timedelta(days=day_offset)
+        rows = list(_rows(spec, day, rng, pairs, venues))
+        if rows:
+            rows.append(rows[-1])  # the report repeats rows now and then
+        buffer.extend(rows)
+        if len(buffer) >= ROWS_PER_WRITE:
+            yield "".join(buffer).encode()
+            buffer.clear()
+    buffer.append("</tbody></table></body></html>")
+    yield "".join(buffer).encode()
+
+
+def write_payload(spec, path):
+    """Write the synthetic report to `path` and return its size in bytes."""
+    size = 0
+    with open(path, "wb") as f:
+        for chunk in iter_payload(spec):
+            f.write(chunk)
+            size += len(chunk)
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic PYTHON6_TRAINING_PLAN report.")
+    parser.add_argument("--out", required=True, help="HTML file to write")
+    parser.add_argument("--scale", type=float, default=1, help="multiplier of today's sessions per day")
+    for field in ['sports', 'groups_per_sport', 'venues', 'sessions_per_day', 'weeks', 'seed']:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    spec = scaled(BASE_SPEC, args.scale)
+    spec = spec._replace(**{
+        field: getattr(args, field)
+        for field in ['sports', 'groups_per_sport', 'venues', 'sessions_per_day', 'weeks', 'seed']
+        if getattr(args, field) is not None
+    })
+    size = write_payload(spec, args.out)
+    print(f"Wrote {args.out}: {size / 1e6:.1f} MB, {spec.sessions_per_day * spec.weeks * 7} sessions ({spec})")
+
+
+if __name__ == "__main__":
+    main()
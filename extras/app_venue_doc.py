@@ -2,7 +2,7 @@ import streamlit as st
 from io import BytesIO, StringIO
 import requests
 import pandas as pd
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 from openpyxl import load_workbook
 from openpyxl.styles import Alignment
 import shutil
@@ -11,6 +11,11 @@ from docx import Document
 from docx.shared import Pt
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.oxml import OxmlElement
+import sys
+
+# Make the shared trainingplan package importable when run from extras/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trainingplan.times import add_local_times
 
 # ---- Page Configuration ----
 st.set_page_config(
@@ -40,17 +45,8 @@ def load_data(selected_date):
     df = data.drop(columns=['About'], errors='ignore').drop_duplicates()
     df.columns = df.columns.str.replace(' ', '_')
     
-    # Convert timestamps
-    def convert_to_time(timestamp_ms, offset_hours=11):
-        try:
-            if pd.notnull(timestamp_ms):
-                timestamp_s = float(timestamp_ms) / 1000
-                return (datetime.fromtimestamp(timestamp_s, tz=timezone.utc) - timedelta(hours=offset_hours)).strftime('%H:%M')
-        except (ValueError, TypeError):
-            return None
-    
-    df['Start_Time'] = pd.to_numeric(df['Start_Time'], errors='coerce').apply(lambda x: convert_to_time(x))
-    df['Finish_Time'] = pd.to_numeric(df['Finish_Time'], errors='coerce').apply(lambda x: convert_to_time(x))
+    # Convert timestamps (shared vectorized conversion)
+    df = add_local_times(df)
     df = df[df['Sport'].notna() & (df['Sport'].str.strip() != '')]
     df = df[df['Venue'] != 'AASMC']
     df = df[df['Sport'] != 'Generic Athlete']
@@ -2,10 +2,9 @@
 # IMPORTS
 # ---------------------------
 # import streamlit as st  # <-- commented out Streamlit parts
-from io import BytesIO, StringIO
-import requests
+from io import BytesIO
 import pandas as pd
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 from openpyxl import load_workbook
 from openpyxl.styles import Alignment
 import shutil
@@ -15,6 +14,12 @@ from docx.shared import Pt
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn  # needed for cell shading
+import sys
+
+# Make the shared trainingplan package importable when run as `python extras/debug.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trainingplan.smartabase import fetch_report
+from trainingplan.times import add_local_times
 
 # ---------------------------
 # (Optional) Streamlit page configuration -- commented out for debugging
@@ -52,27 +57,17 @@ print(f"Selected Date Range: {start_date.strftime('%a %d %b %Y')} to {end_date.s
 # ---------------------------
 # STEP 2: Retrieve the training data from the URL
 # ---------------------------
-session = requests.Session()
-session.auth = ("sb_sap.etl", "A1s2p3!re")  # Adjust credentials if needed
-response = session.get("https://aspire.smartabase.com/aspireacademy/live?report=PYTHON6_TRAINING_PLAN&updategroup=true")
-response.raise_for_status()  # Stop if an HTTP error occurred
-data = pd.read_html(StringIO(response.text))[0]
-df = data.drop(columns=['About'], errors='ignore').drop_duplicates()
+# Goes through the shared on-disk cache, so re-running the script does not download the report again
+data = fetch_report()
+df = data.drop_duplicates()
 # Convert column names to strings and replace spaces with underscores
 df.columns = df.columns.astype(str).str.replace(' ', '_')
 
 # ---------------------------
 # STEP 3: Convert timestamps (Start_Time and Finish_Time)
 # ---------------------------
-# Inline conversion: convert the numeric timestamp (in ms) to '%H:%M'
-df['Start_Time'] = pd.to_numeric(df['Start_Time'], errors='coerce').apply(
-    lambda x: (datetime.fromtimestamp(x/1000, tz=timezone.utc) - timedelta(hours=11)).strftime('%H:%M')
-    if pd.notnull(x) else None
-)
-df['Finish_Time'] = pd.to_numeric(df['Finish_Time'], errors='coerce').apply(
-    lambda x: (datetime.fromtimestamp(x/1000, tz=timezone.utc) - timedelta(hours=11)).strftime('%H:%M')
-    if pd.notnull(x) else None
-)
+# Shared vectorized conversion: numeric timestamp (in ms) to '%H:%M' plus Start_Minutes/Finish_Minutes
+df = add_local_times(df)
 
 # ---------------------------
 # STEP 4: Filter the data
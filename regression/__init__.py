@@ -0,0 +1 @@
+"""Golden-output regression check of the weekly reports (python -m regression.golden)."""
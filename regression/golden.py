@@ -0,0 +1,188 @@
+"""
+Golden-output check of the weekly reports.
+
+Every fixture payload in regression/fixtures/ is a frozen Smartabase
+report. For each fixture week the pipeline is run offline (parse, clean,
+filter, pivot and the three renderers, with the app's layout) and the
+reports are reduced to text lines:
+
+    excel C6 = 'Venue 3\\n07:00-08:30' [center/center wrap]
+    venue table 2 row 4 = ('Monday 07 Apr 2025', '07:00 - 08:30', ...) fill D3D3D3
+    occupancy row 3 = ('Monday 07 Apr 2025', 'Venue 3', ...)
+
+Those lines are compared with regression/golden/<fixture>_<week>.txt and
+any difference is printed as a unified diff, so a rewrite of the pivot,
+the template fill or the Word writers cannot change a calendar cell or
+a report row unnoticed. Each fixture week, and a synthetic week filling
+every calendar row of the template, is also rendered with both Excel
+writers and the two workbooks compared cell by cell (see
+trainingplan.xlsxpatch.check_equivalence), so the opt-in OOXML writer
+cannot drift from the default openpyxl one.
+
+    python -m regression.golden                   # check (exit status 1 on a difference)
+    python -m regression.golden --writer ooxml    # check the other Excel writer too
+    python -m regression.golden --update          # accept the current output as golden
+"""
+import argparse
+import difflib
+import os
+from datetime import date
+from io import BytesIO
+
+from docx import Document
+from docx.oxml.ns import qn
+from openpyxl import load_workbook
+
+from trainingplan.layout import CALENDAR_LAYOUT
+from trainingplan.pipeline import filter_week, week_end
+from trainingplan.reports import max_occupancy_report, venue_usage_report
+from trainingplan.sessions import DAY_ORDER, session_pivot
+from trainingplan.smartabase import clean_report, read_report
+from trainingplan.template import EXCEL_WRITER, render_calendar
+from trainingplan.xlsxpatch import check_equivalence, synthetic_week
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(HERE, "fixtures")
+GOLDEN_DIR = os.path.join(HERE, "golden")
+
+# Weeks rendered from each fixture (Sundays); every fixture covers them.
+FIXTURE_WEEKS = {
+    "synthetic_seed1.html": [date(2025, 2, 9), date(2025, 2, 16)],
+    "synthetic_seed2.html": [date(2025, 2, 9)],
+    "edge_cases.html": [date(2025, 2, 9)],
+}
+
+
+def excel_lines(excel_file):
+    """Non-empty cells of the Template sheet with their alignment, in sheet order."""
+    sheet = load_workbook(BytesIO(excel_file.getvalue()))["Template"]
+    lines = []
+    for row in sheet.iter_rows():
+        for cell in row:
+            if cell.value is None:
+                continue
+            alignment = cell.alignment
+            wrap = " wrap" if alignment.wrap_text else ""
+            lines.append(f"excel {cell.coordinate} = {cell.value!r} "
+                         f"[{alignment.horizontal}/{alignment.vertical}{wrap}]")
+    return lines
+
+
+def _cell_fill(cell):
+    shading = cell._tc.tcPr.find(qn('w:shd')) if cell._tc.tcPr is not None else None
+    return shading.get(qn('w:fill')) if shading is not None else None
+
+
+def docx_lines(docx_file, prefix):
+    """Headings / paragraphs and every table row (texts plus the row's shading) of a Word report."""
+    document = Document(BytesIO(docx_file.getvalue()))
+    lines = [f"{prefix} paragraph = {p.text!r}" for p in document.paragraphs if p.text]
+    for t, table in enumerate(document.tables):
+        for r, row in enumerate(table.rows):
+            fill = _cell_fill(row.cells[0])
+            lines.append(f"{prefix} table {t} row {r} = {tuple(c.text for c in row.cells)!r}"
+                         + (f" fill {fill}" if fill else ""))
+    return lines
+
+
+def fixture_week(payload_path, week):
+    """Sessions of one week of a fixture payload and their calendar pivot: (filtered_df, pivot_df)."""
+    with open(payload_path, "rb") as f:
+        data = read_report([f.read()], start_date=week, end_date=week_end(week))
+    filtered_df = filter_week(clean_report(data), week)
+    return filtered_df, session_pivot(filtered_df, DAY_ORDER)
+
+
+def render_lines(payload_path, week, writer=EXCEL_WRITER):
+    """Run the pipeline on a fixture payload for one week and reduce the reports to text lines."""
+    filtered_df, pivot_df = fixture_week(payload_path, week)
+    excel_file, missing = render_calendar(pivot_df, CALENDAR_LAYOUT, week, writer)
+    return (
+        excel_lines(excel_file)
+        + [f"missing {row['sport']} - {row['training_group']}" for row in missing]
+        + docx_lines(venue_usage_report(filtered_df, week, CALENDAR_LAYOUT), "venue")
+        + docx_lines(max_occupancy_report(filtered_df, week, CALENDAR_LAYOUT), "occupancy")
+    )
+
+
+def golden_path(fixture, week):
+    return os.path.join(GOLDEN_DIR, f"{os.path.splitext(fixture)[0]}_{week.isoformat()}.txt")
+
+
+def check(writer=EXCEL_WRITER, update=False):
+    """
+    Compare (or with update=True, rewrite) every golden file.
+    :return: number of fixture weeks whose output differs from its golden file
+    """
+    failures = 0
+    for fixture, weeks in FIXTURE_WEEKS.items():
+        for week in weeks:
+            path = golden_path(fixture, week)
+            lines = render_lines(os.path.join(FIXTURE_DIR, fixture), week, writer)
+            if update:
+                os.makedirs(GOLDEN_DIR, exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+                print(f"updated {os.path.relpath(path, HERE)} ({len(lines)} lines)")
+                continue
+
+            try:
+                with open(path, encoding="utf-8") as f:
+                    golden = f.read().splitlines()
+            except FileNotFoundError:
+                golden = []
+            if golden == lines:
+                print(f"ok      {fixture} week {week} ({len(lines)} lines)")
+                continue
+            failures += 1
+            print(f"CHANGED {fixture} week {week}:")
+            print("\n".join(difflib.unified_diff(
+                golden, lines, fromfile=os.path.relpath(path, HERE), tofile="current output", lineterm="", n=1,
+            )))
+    return failures
+
+
+def _equivalence_failed(name, differences):
+    if not differences:
+        print(f"ok      {name}: ooxml == openpyxl")
+        return False
+    print(f"WRITERS {name}: {len(differences)} cell(s) differ between ooxml and openpyxl:")
+    print("\n".join("  " + line for line in differences[:20]))
+    return True
+
+
+def check_writers():
+    """
+    Render every fixture week and the synthetic week with both Excel writers.
+    :return: number of weeks whose workbooks differ
+    """
+    failures = 0
+    for fixture, weeks in FIXTURE_WEEKS.items():
+        for week in weeks:
+            _, pivot_df = fixture_week(os.path.join(FIXTURE_DIR, fixture), week)
+            differences = check_equivalence(pivot_df, CALENDAR_LAYOUT, week)
+            failures += _equivalence_failed(f"{fixture} week {week}", differences)
+    pivot_df, layout = synthetic_week()
+    failures += _equivalence_failed("synthetic week", check_equivalence(pivot_df, layout, date(2025, 2, 9)))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the weekly reports of the fixture payloads with the golden files.")
+    parser.add_argument("--writer", choices=["ooxml", "openpyxl"], default=EXCEL_WRITER, help="Excel writer to check")
+    parser.add_argument("--update", action="store_true", help="rewrite the golden files from the current output")
+    args = parser.parse_args(argv)
+
+    failures = check(args.writer, args.update)
+    if failures:
+        print(f"\n{failures} fixture week(s) differ from the golden files. If the change is intended, "
+              f"rerun with --update and commit the new golden files.")
+    writer_failures = 0 if args.update else check_writers()
+    if writer_failures:
+        print(f"\n{writer_failures} week(s) render differently with the ooxml and openpyxl writers.")
+    if failures or writer_failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
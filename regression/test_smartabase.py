@@ -0,0 +1,74 @@
+"""
+The streaming report parser against pd.read_html, which it replaced.
+
+Each case is a small report table in a shape the live report could
+take; iter_report_frames must give the same cells as pd.read_html.
+
+    python -m pytest regression
+"""
+from io import StringIO
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from trainingplan.smartabase import iter_table_rows, read_report
+
+COLUMNS = ['Sport', 'Training Group', 'Date', 'Venue']
+
+HEADER = "<tr>" + "".join(f"<th>{c}</th>" for c in COLUMNS) + "</tr>"
+TD_HEADER = "<tr>" + "".join(f"<td>{c}</td>" for c in COLUMNS) + "</tr>"
+
+CASES = {
+    "plain": HEADER + "<tr><td>Squash</td><td>Squash 1</td><td>09/02/2025</td><td>Court 1</td></tr>",
+    "empty cells": HEADER + "<tr><td>Squash</td><td></td><td>09/02/2025</td><td> </td></tr>",
+    "line breaks": HEADER + "<tr><td>Squash</td><td>Squash<br>1</td><td>09/02/2025</td>"
+                            "<td>Court 1<br/>and <b>Gym</b></td></tr>",
+    "whitespace": HEADER + "<tr><td>  Squash </td><td>Squash\n\n1</td><td>09/02/2025</td>"
+                           "<td>Court   1</td></tr>",
+    "colspan": HEADER + "<tr><td colspan=2>Squash</td><td>09/02/2025</td><td>Court 1</td></tr>"
+                        "<tr><td>Golf</td><td>Golf 1</td><td>10/02/2025</td><td>Range</td></tr>",
+    "rowspan": HEADER + "<tr><td rowspan=2>Squash</td><td>Squash 1</td><td>09/02/2025</td>"
+                        "<td rowspan=3>Court 1</td></tr>"
+                        "<tr><td>Squash 2</td><td>09/02/2025</td></tr>"
+                        "<tr><td>Golf</td><td>Golf 1</td><td>10/02/2025</td></tr>",
+    "short row": HEADER + "<tr><td>Squash</td><td>Squash 1</td></tr>",
+    "thead td header": "<thead>" + TD_HEADER + "</thead><tbody>"
+                       "<tr><td>Squash</td><td>Squash 1</td><td>09/02/2025</td><td>Court 1</td></tr></tbody>",
+}
+
+
+def _table(rows):
+    return f"<html><body><table>{rows}</table></body></html>"
+
+
+def _chunks(html, size=7):
+    # Small chunks, so cells and tags are split across feeds.
+    data = html.encode()
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_same_cells_as_read_html(name):
+    html = _table(CASES[name])
+    expected = pd.read_html(StringIO(html))[0].astype(object)
+    parsed = read_report(_chunks(html), columns=COLUMNS)
+    assert_frame_equal(parsed, expected[COLUMNS], check_dtype=False)
+
+
+def test_td_header_row():
+    # Without <thead>, pd.read_html numbers the columns; header=0 reads the first row as names.
+    html = _table(TD_HEADER + "<tr><td>Squash</td><td>Squash 1</td><td>09/02/2025</td><td>Court 1</td></tr>")
+    expected = pd.read_html(StringIO(html), header=0)[0].astype(object)
+    assert_frame_equal(read_report(_chunks(html), columns=COLUMNS), expected, check_dtype=False)
+
+
+def test_colspan_header():
+    html = _table("<tr><th colspan=2>Sport</th><th>Date</th></tr><tr><td>a</td><td>b</td><td>c</td></tr>")
+    expected = pd.read_html(StringIO(html))[0]
+    assert next(iter_table_rows(_chunks(html))) == list(expected.columns)
+
+
+def test_no_table():
+    with pytest.raises(ValueError, match="No table found"):
+        read_report(_chunks("<html><body><p>Session expired</p></body></html>"))
@@ -0,0 +1,7 @@
+"""
+Shared data pipeline for the Operations weekly training plan.
+
+The Streamlit app (app.py) and the Thursday email job
+(weekly_training_plan_email.py) both import from here so the Smartabase
+fetch and the report building only live in one place.
+"""
@@ -0,0 +1,3 @@
+from trainingplan.cli import main
+
+main()
@@ -0,0 +1,123 @@
+"""
+Training calendars for several weeks at once.
+
+Preparing a term used to mean one app run per Sunday, each fetching and
+cleaning the report again. render_term fetches and cleans the whole date
+range once, splits the sessions into Sunday-Saturday weeks with a single
+groupby, renders every week's Excel calendar and Word reports in a pool
+of workers and packs them into one zip archive.
+
+Command line:
+    python -m trainingplan term --from 2025-02-16 --to 2025-03-29 --out term.zip
+"""
+import time
+import zipfile
+from collections import namedtuple
+from datetime import timedelta
+from io import BytesIO
+
+import pandas as pd
+
+from trainingplan.delta import load_sessions_incremental
+from trainingplan.instrument import stage
+from trainingplan.layout import CALENDAR_LAYOUT
+from trainingplan.occupancy import WINDOW_MINUTES
+from trainingplan.pipeline import report_names
+from trainingplan.render import EXECUTORS
+from trainingplan.reports import max_occupancy_report, venue_usage_report
+from trainingplan.sessions import DAY_ORDER, calendar_sessions, session_pivot
+from trainingplan.template import EXCEL_WRITER, render_calendar
+
+TermArchive = namedtuple('TermArchive', ['archive', 'weeks', 'missing', 'timings'])
+TermArchive.__doc__ = """
+Rendered reports of a range of weeks.
+archive: BytesIO of the zip, one folder per week (Week_YYYY-MM-DD/) with the .xlsx and both .docx files.
+weeks: the Sundays rendered, in order.
+missing: Sunday -> layout entries without data in that week's pivot.
+timings: seconds for 'load', 'render' and 'total'.
+"""
+
+
+def week_start(day):
+    """The Sunday starting the calendar week of `day`."""
+    return day - timedelta(days=(day.weekday() + 1) % 7)
+
+
+def term_weeks(start_date, end_date):
+    """Sundays of every calendar week overlapping start_date..end_date."""
+    first, last = week_start(start_date), week_start(end_date)
+    return [first + timedelta(weeks=i) for i in range((last - first).days // 7 + 1)]
+
+
+def split_weeks(sessions, weeks):
+    """
+    Split the session table into calendar weeks with one groupby.
+    :param weeks: consecutive Sundays, as returned by term_weeks
+    :return: dict Sunday -> sessions of that week (empty frame for weeks without sessions)
+    """
+    days = (pd.to_datetime(sessions['Date'], errors='coerce') - pd.Timestamp(weeks[0])).dt.days
+    week_index = days // 7
+    in_range = week_index.between(0, len(weeks) - 1)
+    by_week = {
+        weeks[int(i)]: group
+        for i, group in sessions[in_range].groupby(week_index[in_range], sort=True)
+    }
+    return {sunday: by_week.get(sunday, sessions.iloc[:0]) for sunday in weeks}
+
+
+def render_week(week_sessions, start_date, layout, window_minutes=WINDOW_MINUTES, writer=EXCEL_WRITER):
+    """
+    Clean, pivot and render one week.
+    :return: (start_date, {file name: bytes}, layout entries without data in the pivot)
+    """
+    filtered_df = calendar_sessions(week_sessions)
+    pivot_df = session_pivot(filtered_df, DAY_ORDER)
+    excel_file, missing = render_calendar(pivot_df, layout, start_date, writer)
+    files = (
+        excel_file,
+        venue_usage_report(filtered_df, start_date, layout),
+        max_occupancy_report(filtered_df, start_date, layout, window_minutes),
+    )
+    return start_date, {name: f.getvalue() for name, f in zip(report_names(start_date), files)}, missing
+
+
+def render_term(start_date, end_date, layout=CALENDAR_LAYOUT, executor="thread", max_workers=None,
+                window_minutes=WINDOW_MINUTES, writer=EXCEL_WRITER, sessions=None):
+    """
+    Render the reports of every calendar week overlapping start_date..end_date into one zip.
+    :param executor: "thread" (default) or "process", see trainingplan.render.render_reports
+    :param sessions: cleaned session table covering the range; fetched (once) when None
+    :return: TermArchive
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor must be one of {sorted(EXECUTORS)}, got {executor!r}.")
+    if end_date < start_date:
+        raise ValueError(f"end_date {end_date} is before start_date {start_date}.")
+
+    started = time.perf_counter()
+    weeks = term_weeks(start_date, end_date)
+    if sessions is None:
+        sessions, _ = load_sessions_incremental(start_date=weeks[0], end_date=weeks[-1] + timedelta(days=6))
+    with stage("term.split", rows=len(sessions)):
+        by_week = split_weeks(sessions, weeks)
+    loaded = time.perf_counter()
+
+    archive = BytesIO()
+    missing = {}
+    with stage("term.render", rows=len(weeks)), EXECUTORS[executor](max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(render_week, by_week[sunday], sunday, layout, window_minutes, writer)
+            for sunday in weeks
+        ]
+        # xlsx and docx files are zip packages already, so they are stored uncompressed.
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zf:
+            for future in futures:
+                sunday, files, missing[sunday] = future.result()
+                for name, data in files.items():
+                    zf.writestr(f"Week_{sunday.isoformat()}/{name}", data)
+    archive.seek(0)
+
+    finished = time.perf_counter()
+    timings = {'load': loaded - started, 'render': finished - loaded, 'total': finished - started}
+    return TermArchive(archive, weeks, missing, timings)
+
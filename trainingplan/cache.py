@@ -0,0 +1,161 @@
+"""
+On-disk cache of the raw Smartabase report payload.
+
+Every report build used to download the whole PYTHON6_TRAINING_PLAN
+report again. The cache keeps the last payload per URL next to a small
+JSON file with the fetch time, SHA-256 of the body and the ETag /
+Last-Modified headers:
+
+* within `ttl` seconds the payload is streamed straight from disk;
+* after that the request is sent with If-None-Match / If-Modified-Since
+  and a 304 answer reuses the stored body;
+* otherwise the new body is written to disk while it is being parsed,
+  and swapped in atomically once complete.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from trainingplan.fetch import as_client, restarting
+
+CACHE_DIR = os.environ.get(
+    "TRAININGPLAN_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "smartabase"),
+)
+CACHE_TTL_SECONDS = int(os.environ.get("TRAININGPLAN_CACHE_TTL", 15 * 60))
+READ_CHUNK_BYTES = 64 * 1024
+
+
+def _paths(cache_dir, url):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:24]
+    return os.path.join(cache_dir, f"{key}.html"), os.path.join(cache_dir, f"{key}.json")
+
+
+def read_cache_meta(url, cache_dir=CACHE_DIR):
+    """Metadata of the cached payload for `url` (fetched_at, sha256, size, etag, last_modified), or None."""
+    body_path, meta_path = _paths(cache_dir, url)
+    if not (os.path.exists(body_path) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _iter_file(path, chunk_size):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _tee_to_cache(response, url, cache_dir, chunk_size):
+    """Yield the response body while writing it to the cache; commit it once fully read."""
+    body_path, meta_path = _paths(cache_dir, url)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".part")
+    complete = False
+    try:
+        with os.fdopen(fd, "wb") as f:
+            stream = response.iter_content(chunk_size=chunk_size)
+            try:
+                for chunk in stream:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                    yield chunk
+            except GeneratorExit:
+                # The parser stopped early (e.g. after the table); keep the rest for the cache.
+                for chunk in stream:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+        complete = True
+    finally:
+        response.close()
+        if complete:
+            os.replace(tmp, body_path)
+            _write_json(meta_path, {
+                "url": url,
+                "fetched_at": time.time(),
+                "sha256": digest.hexdigest(),
+                "size": size,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            })
+        elif os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def iter_cached_report(session, url, cache_dir=CACHE_DIR, ttl=CACHE_TTL_SECONDS, chunk_size=READ_CHUNK_BYTES):
+    """
+    Yield the report body for `url` as byte chunks, going through the disk cache.
+    :param session: ReportClient (or requests.Session) used when the cache is stale or empty
+    :param ttl: seconds a cached payload is served without asking the server
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    body_path, meta_path = _paths(cache_dir, url)
+    meta = read_cache_meta(url, cache_dir)
+
+    if meta is not None and time.time() - meta.get("fetched_at", 0) < ttl:
+        yield from _iter_file(body_path, chunk_size)
+        return
+
+    headers = {}
+    if meta is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = as_client(session).get(url, headers=headers)
+    if response.status_code == 304 and meta is not None:
+        response.close()
+        meta["fetched_at"] = time.time()
+        _write_json(meta_path, meta)
+        yield from _iter_file(body_path, chunk_size)
+        return
+
+    try:
+        response.raise_for_status()
+    except Exception:
+        response.close()
+        raise
+    yield from _tee_to_cache(response, url, cache_dir, chunk_size)
+
+
+def refresh_cached_report(session, url, cache_dir=CACHE_DIR, ttl=CACHE_TTL_SECONDS):
+    """
+    Bring the cached payload for `url` up to date without parsing it and return its metadata.
+    Same rules as iter_cached_report: no request within `ttl`, then a conditional request.
+    """
+    meta = read_cache_meta(url, cache_dir)
+    if meta is None or time.time() - meta.get("fetched_at", 0) >= ttl:
+        def download():
+            for _ in iter_cached_report(session, url, cache_dir, ttl):
+                pass
+        restarting(download)
+        meta = read_cache_meta(url, cache_dir)
+    return meta
+
+
+def clear_cache(cache_dir=CACHE_DIR):
+    """Remove every cached payload."""
+    if not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        if name.endswith((".html", ".json", ".part", ".tmp")):
+            os.remove(os.path.join(cache_dir, name))
@@ -0,0 +1,127 @@
+"""
+Command line for the weekly reports, without Streamlit.
+
+    python -m trainingplan build --week 2025-02-16 --out reports/
+    python -m trainingplan term --from 2025-02-16 --to 2025-03-29 --out term.zip
+
+`build` writes the Excel calendar and both Word reports of one week
+(the upcoming Sunday when --week is left out); `term` renders a range of
+weeks into one zip (see trainingplan.batch). Both end with the stage
+timings of the run (see trainingplan.instrument). The pipeline modules are
+imported by the command that needs them, so --help and argument errors
+return without loading pandas, openpyxl or python-docx.
+"""
+import argparse
+import time
+from datetime import date
+
+EXECUTOR_CHOICES = ["thread", "process"]
+WRITER_CHOICES = ["ooxml", "openpyxl"]
+LAYOUT_CHOICES = ["calendar", "email"]
+
+
+def sunday(text):
+    """argparse type: a YYYY-MM-DD date that falls on a Sunday."""
+    day = date.fromisoformat(text)
+    if day.weekday() != 6:
+        raise argparse.ArgumentTypeError(f"{text} is a {day:%A}, weeks start on a Sunday.")
+    return day
+
+
+def build(args):
+    from trainingplan.delta import describe_delta
+    from trainingplan.layout import LAYOUTS
+    from trainingplan.pipeline import build_week, upcoming_sunday
+
+    start_date = args.week or upcoming_sunday(date.today())
+    started = time.perf_counter()
+    week, reports, paths = build_week(start_date, args.out, layout=LAYOUTS[args.layout],
+                                      executor=args.executor, writer=args.writer, url=args.url)
+    print(f"Week {start_date:%d %b %Y}: changes since last fetch: {describe_delta(week.delta)}")
+    for row in reports.missing:
+        print(f"No data: {row['sport']} - {row['training_group']}")
+    for path in paths:
+        print(f"Wrote {path}")
+    print(f"Done in {time.perf_counter() - started:.2f} s (rendering {reports.timings['total']:.2f} s)")
+
+
+def term(args):
+    from trainingplan.batch import render_term, term_weeks
+    from trainingplan.delta import describe_delta, load_sessions_incremental
+    from trainingplan.layout import LAYOUTS
+    from trainingplan.pipeline import week_end
+
+    started = time.perf_counter()
+    weeks = term_weeks(args.start_date, args.end_date)
+    sessions, delta = load_sessions_incremental(start_date=weeks[0], end_date=week_end(weeks[-1]), url=args.url)
+    print(f"Changes since last fetch: {describe_delta(delta)}")
+    result = render_term(args.start_date, args.end_date, layout=LAYOUTS[args.layout], executor=args.executor,
+                         max_workers=args.workers, writer=args.writer, sessions=sessions)
+    with open(args.out, "wb") as f:
+        f.write(result.archive.getvalue())
+
+    for week in result.weeks:
+        print(f"Week {week:%d %b %Y}: {len(result.missing[week])} groups without sessions")
+    print(f"Wrote {len(result.weeks)} weeks to {args.out} in {time.perf_counter() - started:.2f} s "
+          f"(rendering {result.timings['render']:.2f} s)")
+
+
+def parser():
+    root = argparse.ArgumentParser(prog="python -m trainingplan", description="Operations weekly training plan reports.")
+    commands = root.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="build the reports of one week")
+    build_parser.add_argument("--week", type=sunday, default=None,
+                              help="Sunday starting the week (YYYY-MM-DD); defaults to the upcoming Sunday")
+    build_parser.add_argument("--out", default=".", help="directory for the .xlsx and .docx files")
+    build_parser.set_defaults(handler=build)
+
+    term_parser = commands.add_parser("term", help="build several weeks into one zip archive")
+    term_parser.add_argument("--from", dest="start_date", required=True, type=date.fromisoformat,
+                             help="first day of the range (YYYY-MM-DD); its week starts on the Sunday before")
+    term_parser.add_argument("--to", dest="end_date", required=True, type=date.fromisoformat,
+                             help="last day of the range (YYYY-MM-DD)")
+    term_parser.add_argument("--out", required=True, help="path of the zip archive to write")
+    term_parser.add_argument("--workers", type=int, default=None, help="number of weeks rendered at the same time")
+    term_parser.set_defaults(handler=term)
+
+    for command in (build_parser, term_parser):
+        command.add_argument("--layout", choices=LAYOUT_CHOICES, default="calendar",
+                             help="template layout: the app's (calendar) or the email job's")
+        command.add_argument("--executor", choices=EXECUTOR_CHOICES, default="thread")
+        command.add_argument("--writer", choices=WRITER_CHOICES, default=None,
+                             help="Excel writer (default: TRAININGPLAN_EXCEL_WRITER, else openpyxl)")
+        command.add_argument("--url", default=None,
+                             help="report URL (default: TRAININGPLAN_REPORT_URL, else the live Smartabase report)")
+        command.add_argument("--stages-json", default=None,
+                             help="also write the stage timings of this run to this JSON file")
+    return root
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    from trainingplan.fetch import retry_summary
+    from trainingplan.instrument import load_last, profiled
+    from trainingplan.smartabase import report_client
+    if args.writer is None:
+        from trainingplan.template import EXCEL_WRITER
+        args.writer = EXCEL_WRITER
+    if args.url is None:
+        from trainingplan.smartabase import REPORT_URL
+        args.url = REPORT_URL
+
+    with profiled(f"cli_{args.command}") as profile:
+        args.handler(args)
+    # Stage table of this run next to the previous one ('!' marks a stage that got slower).
+    print()
+    print(profile.summary(load_last(profile.name)))
+    retries = retry_summary(report_client().attempts)
+    if retries:
+        print(retries)
+    profile.save_last()
+    if args.stages_json:
+        profile.save(args.stages_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Incremental ingestion of the session table.
+
+Only a few sessions change between Thursday runs, so each fetch is
+diffed against a persisted session store instead of being treated as
+brand new. A session is identified by a stable key built from Sport,
+Training_Group, Date, AM/PM, Venue and Start_Time; rows sharing a key
+(e.g. two coaches on one session) are told apart by their position
+within the key. The diff is applied to the store as inserts, updates
+and deletes, and describe_delta reports what changed since the last fetch.
+The pivot and the reports are still rebuilt for the whole week; a week's
+pivot takes about 0.2 s even at 100x today's volume (benchmarks/run.py).
+"""
+import os
+import tempfile
+from collections import namedtuple
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from trainingplan.instrument import stage
+from trainingplan.snapshots import SNAPSHOT_DIR, load_sessions, restore_missing
+
+KEY_COLUMNS = ['Sport', 'Training_Group', 'Date', 'AM/PM', 'Venue', 'Start_Time']
+STORE_PATH = os.path.join(os.path.dirname(SNAPSHOT_DIR), "session_store.feather")
+# The email job parses dates month-first, so it keeps its own store.
+EMAIL_STORE_PATH = os.path.join(os.path.dirname(SNAPSHOT_DIR), "session_store_email.feather")
+
+SessionDelta = namedtuple('SessionDelta', ['inserted', 'updated', 'deleted'])
+SessionDelta.__doc__ = """
+Changes between the stored sessions and a new fetch, each frame indexed
+by session key (see session_keys).
+inserted / deleted: rows only present in the new fetch / the store.
+updated: new version of rows whose key exists in both but whose other columns changed.
+"""
+
+
+def _hash_rows(df, columns):
+    return pd.util.hash_pandas_object(df[columns].astype(str), index=False).to_numpy()
+
+
+def session_keys(sessions):
+    """
+    Stable identity of every row: a 64-bit hash of KEY_COLUMNS plus the
+    row's occurrence number among rows with the same key hash.
+    :return: MultiIndex ('Key', 'Occurrence') aligned with the rows
+    """
+    key = _hash_rows(sessions, KEY_COLUMNS)
+    value_columns = [c for c in sessions.columns if c not in KEY_COLUMNS]
+    # Order duplicates by their other columns so the occurrence number does
+    # not depend on the order the report happened to list them in.
+    tiebreak = _hash_rows(sessions, value_columns) if value_columns else 0
+    order = pd.DataFrame({'Key': key, 'Tie': tiebreak}).sort_values(['Key', 'Tie'], kind='stable')
+    occurrence = order.groupby('Key').cumcount().reindex(order.index).sort_index()
+    return pd.MultiIndex.from_arrays([key, occurrence.to_numpy()], names=['Key', 'Occurrence'])
+
+
+def diff_sessions(old, new):
+    """Compare two session tables by session key and return a SessionDelta."""
+    old_keyed = old.set_axis(session_keys(old))
+    new_keyed = new.set_axis(session_keys(new))
+
+    inserted = new_keyed[~new_keyed.index.isin(old_keyed.index)]
+    deleted = old_keyed[~old_keyed.index.isin(new_keyed.index)]
+
+    both = new_keyed.index.intersection(old_keyed.index)
+    columns = [c for c in new.columns if c in old.columns]
+    changed = _hash_rows(new_keyed.loc[both], columns) != _hash_rows(old_keyed.loc[both], columns)
+    updated = new_keyed.loc[both[changed]]
+    return SessionDelta(inserted, updated, deleted)
+
+
+def apply_delta(store, delta):
+    """
+    Return the store with the delta's deletes, updates and inserts applied.
+    `store` must be the same table the delta was diffed against.
+    """
+    keyed = store.set_axis(session_keys(store))
+    kept = keyed[~keyed.index.isin(delta.deleted.index.append(delta.updated.index))]
+    parts = [f for f in (kept, delta.updated, delta.inserted) if len(f)]
+    if not parts:
+        return store.iloc[:0]
+    return pd.concat(parts).reset_index(drop=True)
+
+
+def load_store(path=STORE_PATH):
+    """The persisted session store (empty DataFrame if none has been saved yet)."""
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return restore_missing(feather.read_table(path, memory_map=True).to_pandas())
+
+
+def save_store(store, path=STORE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    feather.write_feather(pa.Table.from_pandas(store, preserve_index=False), tmp, compression='uncompressed')
+    os.replace(tmp, path)
+
+
+def _in_window(df, start_date, end_date):
+    if start_date is None or end_date is None or df.empty:
+        return pd.Series(True, index=df.index)
+    dates = df['Date']
+    return dates.notna() & (dates >= start_date) & (dates <= end_date)
+
+
+def ingest(sessions, start_date=None, end_date=None, path=STORE_PATH):
+    """
+    Diff a fetched session table against the store and persist the result.
+
+    When the fetch was limited to start_date..end_date only stored rows in
+    that window take part in the diff, so sessions of other weeks are not
+    reported as deleted.
+    :return: SessionDelta of what changed
+    """
+    store = load_store(path)
+    if store.empty:
+        store = sessions.iloc[:0]
+
+    in_window = _in_window(store, start_date, end_date)
+    inside = store[in_window].reset_index(drop=True)
+    delta = diff_sessions(inside, sessions.reset_index(drop=True))
+    if len(delta.inserted) or len(delta.updated) or len(delta.deleted):
+        outside = store[~in_window]
+        save_store(pd.concat([outside, apply_delta(inside, delta)], ignore_index=True), path)
+    return delta
+
+
+def load_sessions_incremental(start_date=None, end_date=None, store_path=STORE_PATH, **kwargs):
+    """
+    load_sessions() plus a diff against the session store.
+    :return: (sessions, SessionDelta)
+    """
+    sessions = load_sessions(start_date=start_date, end_date=end_date, **kwargs)
+    with stage("ingest", rows=len(sessions)):
+        delta = ingest(sessions, start_date, end_date, store_path)
+    return sessions, delta
+
+
+def describe_delta(delta):
+    """One-line summary, e.g. '3 new, 1 updated, 0 removed sessions'."""
+    return (f"{len(delta.inserted)} new, {len(delta.updated)} updated, "
+            f"{len(delta.deleted)} removed sessions")
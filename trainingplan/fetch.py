@@ -0,0 +1,297 @@
+"""
+HTTP client for the report download: pooled connections, timeouts and retries.
+
+A bare session.get() has no timeout, so a stalled Smartabase response used
+to hang a Streamlit worker or the scheduled job until it was killed, and
+every fetch built a new requests.Session. ReportClient wraps one pooled,
+keep-alive session (shared per process, see smartabase.report_client) and:
+
+* bounds every attempt with a connect and a read timeout (the read timeout
+  is the longest wait for the next bytes, not for the whole body);
+* retries connection errors, timeouts and 429/5xx answers up to
+  max_attempts, sleeping with exponential backoff and full jitter (at least
+  Retry-After when the server sends one);
+* resumes a body that breaks off half way by requesting it again and
+  skipping the bytes already delivered, so the streaming parser never sees
+  the failure. Only an equal ETag or Last-Modified proves the new body is
+  the same one (an equal length does not); otherwise ResumeError is
+  raised and restarting() downloads the report again from byte 0;
+* asks for gzip; requests decodes it while streaming, so callers always
+  get the plain HTML;
+* records every attempt as an Attempt (status or error, seconds to the
+  headers, seconds to the end of the body, bytes, backoff) in
+  client.attempts and as a JSON line on the "trainingplan.stages.fetch"
+  logger, written to TRAININGPLAN_STAGE_LOG with the stages.
+"""
+import json
+import logging
+import os
+import random
+import time
+from collections import deque, namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from trainingplan.instrument import stage
+
+CONNECT_TIMEOUT = float(os.environ.get("TRAININGPLAN_CONNECT_TIMEOUT", 10))
+# Smartabase builds the report before the first byte, so the read timeout is generous.
+READ_TIMEOUT = float(os.environ.get("TRAININGPLAN_READ_TIMEOUT", 120))
+MAX_ATTEMPTS = int(os.environ.get("TRAININGPLAN_FETCH_ATTEMPTS", 4))
+# Fresh downloads from byte 0 after a body that could not be resumed.
+MAX_RESTARTS = 2
+BACKOFF_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+POOL_SIZE = 8
+ATTEMPT_HISTORY = 200
+
+# Headers that identify the body; a resumed body must repeat at least one of them.
+# Content-Length is not one: a changed report can keep the same length.
+BODY_VALIDATORS = ("ETag", "Last-Modified")
+
+# Failures worth another attempt: refused / reset connections, timeouts, bodies cut short.
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+logger = logging.getLogger("trainingplan.stages.fetch")
+
+Attempt = namedtuple('Attempt', ['url', 'attempt', 'status', 'error', 'headers_seconds', 'wall',
+                                 'bytes', 'backoff', 'resumed_at'])
+Attempt.__doc__ = """
+One HTTP request made by a ReportClient.
+attempt: 1 for the first request of a fetch, counting up with every retry or resume.
+status: HTTP status, None when no answer arrived; error: exception class name, or None.
+headers_seconds: time until the response headers; wall: until the end of the body (or the failure).
+bytes: body bytes delivered to the caller; backoff: seconds slept before this attempt.
+resumed_at: body offset this attempt resumed from (None for a fresh request).
+"""
+
+
+class ReportClient:
+    """Pooled requests.Session with timeouts, retries with backoff and per-attempt metrics."""
+
+    def __init__(self, auth=None, session=None, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_attempts=MAX_ATTEMPTS, backoff=BACKOFF_SECONDS, backoff_max=BACKOFF_MAX_SECONDS,
+                 pool_size=POOL_SIZE):
+        """
+        :param session: requests.Session to use as is (a pooled one is created otherwise)
+        """
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Accept-Encoding"] = "gzip"
+        if auth is not None:
+            session.auth = auth
+        self.session = session
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.attempts = deque(maxlen=ATTEMPT_HISTORY)
+        self._rng = random.Random()
+
+    def backoff_delay(self, retry, retry_after=None):
+        """Seconds to sleep before retry number `retry` (1-based): full jitter, at least Retry-After."""
+        delay = self._rng.uniform(0, min(self.backoff_max, self.backoff * 2 ** (retry - 1)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def record(self, url, attempt, status, error, headers_seconds, started, size, backoff, resumed_at=None):
+        entry = Attempt(url, attempt, status, error, headers_seconds, time.perf_counter() - started,
+                        size, backoff, resumed_at)
+        self.attempts.append(entry)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"fetch_attempt": entry._asdict()}))
+        return entry
+
+    def get(self, url, headers=None, first_attempt=1, resume_from=None, backoff=0.0):
+        """
+        GET `url` as a stream, retrying until the headers of a final answer arrive.
+        :param backoff: seconds to sleep before the first attempt (used when resuming)
+        :return: ReportResponse (call raise_for_status / close as with requests)
+        :raise: the last RETRY_ERRORS exception when every attempt failed
+        """
+        if backoff:
+            with stage("fetch.backoff"):
+                time.sleep(backoff)
+        last_attempt = first_attempt + self.max_attempts - 1
+        for attempt in range(first_attempt, last_attempt + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, stream=True, headers=headers or {}, timeout=self.timeout)
+            except RETRY_ERRORS as error:
+                self.record(url, attempt, None, type(error).__name__, None, started, 0, backoff, resume_from)
+                if attempt == last_attempt:
+                    raise
+                retry_after = None
+            else:
+                headers_seconds = time.perf_counter() - started
+                if response.status_code not in RETRY_STATUSES or attempt == last_attempt:
+                    return ReportResponse(self, url, headers, response, attempt, started, headers_seconds,
+                                          backoff, resume_from)
+                self.record(url, attempt, response.status_code, None, headers_seconds, started, 0, backoff,
+                            resume_from)
+                retry_after = _retry_after(response)
+                response.close()
+            backoff = self.backoff_delay(attempt - first_attempt + 1, retry_after)
+            with stage("fetch.backoff"):
+                time.sleep(backoff)
+
+    def close(self):
+        self.session.close()
+
+
+def restarting(download, restarts=MAX_RESTARTS):
+    """
+    Call download() and return its result, calling it again from the start
+    (a new request, a new parse) when the body broke off and could not be
+    resumed. The partly read body is thrown away with whatever was built from it.
+    :raise: ResumeError when the last of `restarts` restarts fails the same way
+    """
+    for restart in range(restarts + 1):
+        try:
+            return download()
+        except ResumeError as error:
+            if restart == restarts:
+                raise
+            logger.warning(json.dumps({"fetch_restart": restart + 1, "reason": str(error)}))
+
+
+def as_client(session):
+    """ReportClient for a `session` argument: a ReportClient as is, anything else (a requests.Session) wrapped."""
+    return session if isinstance(session, ReportClient) else ReportClient(session=session)
+
+
+def describe_attempts(attempts):
+    """One line per attempt, e.g. 'attempt 2: 503 after 0.41 s, 0 bytes (backoff 0.83 s)'."""
+    lines = []
+    for a in attempts:
+        outcome = a.error or a.status
+        resumed = f", resumed at byte {a.resumed_at}" if a.resumed_at is not None else ""
+        lines.append(f"attempt {a.attempt}: {outcome} after {a.wall:.2f} s, {a.bytes} bytes "
+                     f"(backoff {a.backoff:.2f} s{resumed})")
+    return lines
+
+
+def retry_summary(attempts):
+    """Text of describe_attempts() when any attempt failed or was answered with a retry status, else ''."""
+    if not any(a.error or a.status in RETRY_STATUSES for a in attempts):
+        return ""
+    return "Fetch attempts:\n" + "\n".join("  " + line for line in describe_attempts(attempts))
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ReportResponse:
+    """
+    Streaming response of a ReportClient. iter_content() resumes the body
+    after a dropped connection or read timeout (see the module docstring).
+    """
+
+    def __init__(self, client, url, headers, response, attempt, started, headers_seconds, backoff, resumed_at):
+        self.client = client
+        self.url = url
+        self.request_headers = headers
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.attempt = attempt
+        self._attempt_metrics = (started, headers_seconds, backoff, resumed_at)
+        self._delivered = 0
+        self._recorded = False
+
+    def raise_for_status(self):
+        self.response.raise_for_status()
+
+    def _finish(self, error=None):
+        if self._recorded:
+            return
+        self._recorded = True
+        started, headers_seconds, backoff, resumed_at = self._attempt_metrics
+        self.client.record(self.url, self.attempt, self.status_code, error, headers_seconds, started,
+                           self._delivered - (resumed_at or 0), backoff, resumed_at)
+
+    def close(self):
+        self._finish()
+        self.response.close()
+
+    def iter_content(self, chunk_size=64 * 1024):
+        """Body chunks (gzip already decoded), resumed after RETRY_ERRORS."""
+        resumes = 0
+        skip = 0
+        while True:
+            try:
+                for chunk in self.response.iter_content(chunk_size=chunk_size):
+                    if skip:
+                        # Bytes the caller already has from an earlier attempt.
+                        if len(chunk) <= skip:
+                            skip -= len(chunk)
+                            continue
+                        chunk, skip = chunk[skip:], 0
+                    self._delivered += len(chunk)
+                    yield chunk
+            except RETRY_ERRORS as error:
+                self._finish(type(error).__name__)
+                self.response.close()
+                if resumes >= self.client.max_attempts - 1:
+                    raise
+                resumes += 1
+                skip = self._delivered
+                self._resume(error, self.client.backoff_delay(resumes))
+                continue
+            if skip:
+                self._finish("ResumeError")
+                raise ResumeError(f"{self.url}: the body ended before the {self._delivered} bytes already read")
+            self._finish()
+            return
+
+    def _resume(self, error, backoff):
+        # Splicing bytes from two responses is only safe when they are known to be the same body.
+        if self._delivered and not any(self.headers.get(name) for name in BODY_VALIDATORS):
+            raise ResumeError(f"{self.url}: cannot resume at byte {self._delivered}, the response has "
+                              f"no {' or '.join(BODY_VALIDATORS)} to check the new body against") from error
+        # Unconditional request: a 304 cannot continue a body.
+        headers = {k: v for k, v in (self.request_headers or {}).items()
+                   if k not in ("If-None-Match", "If-Modified-Since")}
+        replacement = self.client.get(self.url, headers, first_attempt=self.attempt + 1,
+                                      resume_from=self._delivered, backoff=backoff)
+        if replacement.status_code != 200 or (self._delivered and not self._same_body(replacement.headers)):
+            replacement.close()
+            raise ResumeError(f"{self.url}: the report changed while resuming at byte {self._delivered} "
+                              f"(status {replacement.status_code})") from error
+        replacement._recorded = True  # its metrics are recorded through this response from now on
+        self.response = replacement.response
+        self.attempt = replacement.attempt
+        self._attempt_metrics = replacement._attempt_metrics
+        self._recorded = False
+
+    def _same_body(self, headers):
+        """
+        True when every validator sent by either response is equal in both, and there is at least one.
+        Content-Encoding and Content-Length must also be equal, but do not prove the body is the same.
+        """
+        for name in ("Content-Encoding", "Content-Length"):
+            if self.headers.get(name) != headers.get(name):
+                return False
+        compared = False
+        for name in BODY_VALIDATORS:
+            before, after = self.headers.get(name), headers.get(name)
+            if before is None and after is None:
+                continue
+            if before != after:
+                return False
+            compared = True
+        return compared
+
+
+class ResumeError(requests.RequestException):
+    """A broken-off body could not be resumed: the server sent no ETag / Last-Modified, or a different body."""
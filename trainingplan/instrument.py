@@ -0,0 +1,243 @@
+"""
+Stage-level timing and memory instrumentation.
+
+The pipeline marks its steps with `with stage("pivot") as s: ...`
+(and `s.rows = len(df)` where a row count means something). Outside a
+profiled run that costs next to nothing. Inside `with profiled("app"):`
+(or after start_profile() in a flat script) every stage records:
+
+    wall       elapsed seconds
+    cpu        process CPU seconds (stages that run side by side, like the
+               three renderers, each include the others' CPU)
+    peak_rss   process peak resident memory in MB at the end of the stage
+    rss_growth how much the stage raised that peak, in MB
+    rows       row count set by the stage, if any
+
+Dotted names nest ("fetch.download" is part of "fetch"). A Profile can
+be shown as a table, compared with the previous run of the same name
+(stages at least REGRESSION_RATIO slower are flagged), saved as JSON,
+and every stage is also sent as one JSON line to the
+"trainingplan.stages" logger, written to TRAININGPLAN_STAGE_LOG when that
+environment variable names a file.
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_DIR = os.environ.get(
+    "TRAININGPLAN_PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "profiles"),
+)
+STAGE_LOG = os.environ.get("TRAININGPLAN_STAGE_LOG")
+REGRESSION_RATIO = 1.25
+REGRESSION_MIN_SECONDS = 0.05
+
+logger = logging.getLogger("trainingplan.stages")
+if STAGE_LOG:
+    _handler = logging.FileHandler(STAGE_LOG)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_active = contextvars.ContextVar("trainingplan_profile", default=None)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where the resource module is missing)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB on Linux.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Stage:
+    """Measurements of one stage; `rows` may be set while the stage runs."""
+
+    __slots__ = ("name", "rows", "wall", "cpu", "peak_rss", "rss_growth", "_started", "_cpu_started", "_rss_started")
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.wall = self.cpu = self.peak_rss = self.rss_growth = None
+
+    def start(self):
+        self._rss_started = peak_rss_mb()
+        self._cpu_started = time.process_time()
+        self._started = time.perf_counter()
+
+    def stop(self):
+        self.wall = time.perf_counter() - self._started
+        self.cpu = time.process_time() - self._cpu_started
+        self.peak_rss = peak_rss_mb()
+        if self.peak_rss is not None:
+            self.rss_growth = self.peak_rss - self._rss_started
+
+    def as_dict(self):
+        return {"stage": self.name, "wall": self.wall, "cpu": self.cpu, "peak_rss": self.peak_rss,
+                "rss_growth": self.rss_growth, "rows": self.rows}
+
+
+class Profile:
+    """Stages recorded during one run (an app click, an email job, a CLI build)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.stages = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        record = Stage(name, rows)
+        record.start()
+        try:
+            yield record
+        finally:
+            record.stop()
+            self.add(record)
+
+    def add(self, record):
+        """Record a finished Stage (thread-safe) and send it to the stage log."""
+        with self._lock:
+            self.stages.append(record)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"run": self.name, "started_at": self.started_at, **record.as_dict()}))
+
+    def as_dict(self):
+        return {"run": self.name, "started_at": self.started_at, "stages": [s.as_dict() for s in self.stages]}
+
+    def frame(self, previous=None):
+        """
+        One row per stage, in the order the stages finished.
+        :param previous: as_dict() of an earlier run; adds its wall time and a 'regression' flag
+        """
+        frame = pd.DataFrame([s.as_dict() for s in self.stages],
+                             columns=["stage", "wall", "cpu", "peak_rss", "rss_growth", "rows"])
+        if previous is not None:
+            before = {s["stage"]: s["wall"] for s in previous.get("stages", [])}
+            frame["previous_wall"] = frame["stage"].map(before)
+            frame["regression"] = (
+                (frame["wall"] >= frame["previous_wall"] * REGRESSION_RATIO)
+                & (frame["wall"] - frame["previous_wall"] >= REGRESSION_MIN_SECONDS)
+            )
+        return frame
+
+    def summary(self, previous=None):
+        """Plain-text table of the stages (for print), regressions marked with '!'."""
+        lines = [f"{'stage':<28} {'wall s':>8} {'cpu s':>8} {'peak MB':>8} {'+MB':>7} {'rows':>8}"]
+        for row in self.frame(previous).itertuples(index=False):
+            line = (f"{row.stage:<28} {row.wall:>8.3f} {row.cpu:>8.3f} {_number(row.peak_rss, '8.0f')} "
+                    f"{_number(row.rss_growth, '7.1f')} {_number(row.rows, '8.0f')}")
+            if previous is not None and not pd.isna(row.previous_wall):
+                line += f"  (was {row.previous_wall:.3f}){' !' if row.regression else ''}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def save(self, path):
+        """Write the profile as JSON."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def save_last(self, profile_dir=PROFILE_DIR):
+        """Keep this run as the reference the next run of the same name is compared with."""
+        self.save(os.path.join(profile_dir, f"{self.name}.json"))
+
+
+def _number(value, fmt):
+    return format(value, f">{fmt}") if value is not None and not pd.isna(value) else " " * int(fmt.split(".")[0])
+
+
+def load_last(name, profile_dir=PROFILE_DIR):
+    """as_dict() of the last saved run called `name`, or None."""
+    try:
+        with open(os.path.join(profile_dir, f"{name}.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def active_profile():
+    """The Profile recording in this context, or None."""
+    return _active.get()
+
+
+def start_profile(name):
+    """Start recording stages for the rest of this context (for flat scripts); returns the Profile."""
+    profile = Profile(name)
+    _active.set(profile)
+    return profile
+
+
+@contextmanager
+def profiled(name):
+    """Record the stages run inside the block into a new Profile."""
+    profile = Profile(name)
+    token = _active.set(profile)
+    try:
+        yield profile
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def stage(name, rows=None):
+    """Measure a pipeline stage into the active profile (the Stage is measured even without one)."""
+    profile = _active.get()
+    if profile is not None:
+        with profile.stage(name, rows) as record:
+            yield record
+        return
+    record = Stage(name, rows)
+    record.start()
+    try:
+        yield record
+    finally:
+        record.stop()
+
+
+def timed_chunks(chunks, name):
+    """
+    Pass an iterator through, recording the time spent waiting on it as stage `name`.
+    Used for the download, which is interleaved with parsing; rows is the byte count.
+    """
+    profile = _active.get()
+    if profile is None:
+        yield from chunks
+        return
+    record = Stage(name, rows=0)
+    record.start()
+    wall = cpu = 0.0
+    iterator = iter(chunks)
+    try:
+        while True:
+            started, cpu_started = time.perf_counter(), time.process_time()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                wall += time.perf_counter() - started
+                cpu += time.process_time() - cpu_started
+            record.rows += len(chunk)
+            yield chunk
+    finally:
+        record.stop()
+        record.wall, record.cpu = wall, cpu
+        profile.add(record)
@@ -0,0 +1,67 @@
+"""
+Layout of the training calendar template.
+
+Every entry names a (sport, training_group), the template cell where its
+row of day/AM-PM values starts and the group's athlete count (used by
+the occupancy reports). Shared by the app, the email job, the batch
+generator and the command line (--layout calendar / email).
+"""
+
+# Athlete counts are placeholders where unknown (each group defaults to 10 athletes)
+CALENDAR_LAYOUT = [
+    {"sport": "Development", "training_group": "Development 1", "start_cell": "C6", "athlete_count": 14},
+    {"sport": "Development", "training_group": "Development 2", "start_cell": "C8", "athlete_count": 11},
+    {"sport": "Development", "training_group": "Development 3", "start_cell": "C10", "athlete_count": 9},
+    
+    {"sport": "Endurance", "training_group": "Endurance_Senior", "start_cell": "C12", "athlete_count": 18},
+    {"sport": "Jumps", "training_group": "Jumps_Jaco", "start_cell": "C14", "athlete_count": 5},
+    {"sport": "Jumps", "training_group": "Jumps Martin", "start_cell": "C16", "athlete_count": 5},
+    {"sport": "Jumps", "training_group": "Jumps_Ross Jeffs", "start_cell": "C18", "athlete_count": 6},
+    {"sport": "Jumps", "training_group": "Jumps_ElWalid", "start_cell": "C20", "athlete_count": 9},
+    {"sport": "Sprints", "training_group": "Sprints_Lee", "start_cell": "C22", "athlete_count": 8},
+    {"sport": "Sprints", "training_group": "Sprints_Hamdi", "start_cell": "C24", "athlete_count": 9},
+    {"sport": "Throws", "training_group": "Senior Performance Throws", "start_cell": "C26", "athlete_count": 12},
+    {"sport": "Squash", "training_group": "Squash", "start_cell": "C37", "athlete_count": 13},
+    {"sport": "Table Tennis", "training_group": "Table Tennis", "start_cell": "C39", "athlete_count": 5},
+    {"sport": "Fencing", "training_group": "Fencing", "start_cell": "C41", "athlete_count": 16},
+    {"sport": "Swimming", "training_group": "Swimming", "start_cell": "C43", "athlete_count": 16},
+    {"sport": "Padel", "training_group": "Padel", "start_cell": "C45", "athlete_count": 9},
+    {"sport": "Pre Academy Padel", "training_group": "Explorers", "start_cell": "C48", "athlete_count": 10},
+    {"sport": "Pre Academy Padel", "training_group": "Explorers+", "start_cell": "C49", "athlete_count": 10},
+    {"sport": "Pre Academy Padel", "training_group": "Starters", "start_cell": "C50", "athlete_count": 10},
+    {"sport": "Pre Academy", "training_group": "Pre Academy Fencing", "start_cell": "C51", "athlete_count": 10},
+    {"sport": "Pre Academy", "training_group": "Pre Academy Squash Girls", "start_cell": "C53", "athlete_count": 10},
+    {"sport": "Pre Academy", "training_group": "Pre Academy Athletics", "start_cell": "C55", "athlete_count": 10},
+    {"sport": "Girls Programe", "training_group": "Kids", "start_cell": "C58", "athlete_count": 16},
+    {"sport": "Girls Programe", "training_group": "Mini Cadet_U14", "start_cell": "C59", "athlete_count": 8},
+    {"sport": "Girls Programe", "training_group": "Cadet_U16", "start_cell": "C60", "athlete_count": 6},
+    {"sport": "Girls Programe", "training_group": "Youth_U18", "start_cell": "C61", "athlete_count": 3},
+
+    {"sport": "Sprints", "training_group": "Sprints_Steve", "start_cell": "C69", "athlete_count": 11},
+    {"sport": "Sprints", "training_group": "Sprints_Kurt", "start_cell": "C71", "athlete_count": 14},
+    {"sport": "Sprints", "training_group": "Sprints_Rafal", "start_cell": "C73", "athlete_count": 10},
+    {"sport": "Sprints", "training_group": "Sprints_Francis", "start_cell": "C75", "athlete_count": 3},
+    {"sport": "Sprints", "training_group": "Sprints_Yasmani", "start_cell": "C77", "athlete_count": 8},
+
+    {"sport": "Endurance", "training_group": "Endurance_Driss", "start_cell": "C81", "athlete_count": 10},
+    {"sport": "Endurance", "training_group": "Endurance_Kada", "start_cell": "C83", "athlete_count": 5},
+    {"sport": "Endurance", "training_group": "Endurance_Khamis", "start_cell": "C85", "athlete_count": 11},
+    {"sport": "Decathlon", "training_group": "Decathlon_Willem", "start_cell": "C87", "athlete_count": 7},
+    
+    {"sport": "Jumps", "training_group": "Jumps_Linus", "start_cell": "C96", "athlete_count": 4},
+    {"sport": "Jumps", "training_group": "Jumps_Pawel", "start_cell": "C98", "athlete_count": 4},
+
+    {"sport": "Throws", "training_group": "Throws_Kemal", "start_cell": "C102", "athlete_count": 8},
+    {"sport": "Throws", "training_group": "Throws_Krzysztof", "start_cell": "C104", "athlete_count": 4},
+    {"sport": "Throws", "training_group": "Throws_Keida", "start_cell": "C106", "athlete_count": 3},
+]
+
+# The weekly email job uses the same cells, except that Sprints_Yasmani is
+# looked up under Endurance and row 87 holds Decathlon_QAF.
+EMAIL_OVERRIDES = {
+    "C77": {"sport": "Endurance"},
+    "C87": {"training_group": "Decathlon_QAF"},
+}
+EMAIL_LAYOUT = [{**row, **EMAIL_OVERRIDES.get(row["start_cell"], {})} for row in CALENDAR_LAYOUT]
+
+LAYOUTS = {"calendar": CALENDAR_LAYOUT, "email": EMAIL_LAYOUT}
@@ -0,0 +1,223 @@
+"""
+Venue occupancy from the compact session table.
+
+peak_occupancy finds, for every (Day, Venue), the window of
+`window_minutes` with the most athletes in it. It is a sweep line over
+the whole table at once: every session becomes a +count event where it
+starts to overlap a window and a -count event where it stops, the events
+are sorted once, and one cumulative sum gives the occupancy at every
+candidate window start. That is O(n log n) for any number of venue-days,
+so a whole term can be processed in one call.
+
+occupancy_matrix builds the full venues x days x time-slot occupancy
+series with difference arrays, for peak, utilisation and heatmap views.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from trainingplan.times import HHMM
+
+DEFAULT_ATHLETE_COUNT = 10
+WINDOW_MINUTES = 30
+
+
+def athlete_counts(session_table, rows_to_paste, default=DEFAULT_ATHLETE_COUNT):
+    """Athlete count per session, looked up from rows_to_paste by (Sport, Training_Group)."""
+    count_map = {
+        (str(row["sport"]), str(row["training_group"])): row.get("athlete_count", default)
+        for row in rows_to_paste
+    }
+    keys = zip(session_table['Sport'].astype(str), session_table['Training_Group'].astype(str))
+    return pd.Series(
+        [count_map.get(key, default) for key in keys],
+        index=session_table.index,
+        dtype='int64',
+    )
+
+
+def peak_occupancy(session_table, counts, window_minutes=WINDOW_MINUTES):
+    """
+    Peak occupancy of every venue-day in the session table.
+
+    A session counts towards the window [c, c + window_minutes) when
+    start < c + window_minutes and finish > c. Candidate values of c are
+    every start and finish time seen at that venue-day; the earliest
+    candidate with the highest occupancy wins, so results match the old
+    window-by-window scan exactly.
+    :param session_table: table from trainingplan.sessions.build_session_table
+    :param counts: Series of athlete counts aligned with session_table (see athlete_counts)
+    :return: DataFrame with Day, Venue, Window_Start, Window_End (minutes),
+             Max_Occupancy and Groups (sorted list of "Sport - Training_Group").
+             Window_Start/Window_End are -1 when nothing overlaps.
+    """
+    columns = ['Day', 'Venue', 'Window_Start', 'Window_End', 'Max_Occupancy', 'Groups']
+    valid = (
+        (session_table['Day'] >= 0) & (session_table['Start'] >= 0)
+        & (session_table['Finish'] >= 0) & session_table['Venue'].notna()
+    )
+    table = session_table[valid]
+    if table.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Aligned by position, not by label: the reports are rendered in threads that share
+    # filtered_df's index, and pandas' lazy uniqueness check on a shared index is not
+    # thread-safe (reindex then fails now and then with "duplicate labels").
+    counts = counts.to_numpy(dtype='int64')[valid.to_numpy()]
+    keys = table[['Day', 'Venue']].drop_duplicates().sort_values(['Day', 'Venue'])
+    keys = keys.reset_index(drop=True)
+    group_of = pd.MultiIndex.from_frame(keys).get_indexer(pd.MultiIndex.from_frame(table[['Day', 'Venue']]))
+
+    start = table['Start'].to_numpy(dtype='int64')
+    finish = table['Finish'].to_numpy(dtype='int64')
+
+    # Encode (group, minute) in one sortable integer. Minutes are shifted by
+    # window_minutes so the earliest event time is never negative.
+    span = 2 * (24 * 60 + window_minutes) + 1
+
+    def encode(group, minute):
+        return group * span + (minute + window_minutes)
+
+    # On integer minutes a session overlaps the window starting at c for
+    # c in [start - window + 1, finish - 1]; sessions where that range is
+    # empty never count (e.g. finish far before start).
+    first = start - window_minutes + 1
+    live = first <= finish - 1
+    event_keys = np.concatenate([encode(group_of[live], first[live]), encode(group_of[live], finish[live])])
+    event_deltas = np.concatenate([counts[live], -counts[live]])
+    order = np.argsort(event_keys, kind='stable')
+    event_keys = event_keys[order]
+    # running[i] is the occupancy after the first i events.
+    running = np.r_[0, np.cumsum(event_deltas[order])]
+
+    # Every group's deltas sum to zero, so one global cumulative sum is
+    # the occupancy inside each group as well.
+    candidates = np.unique(np.concatenate([encode(group_of, start), encode(group_of, finish)]))
+    occupancy = running[np.searchsorted(event_keys, candidates, side='right')]
+    cand_group = candidates // span
+    cand_minute = candidates % span - window_minutes
+
+    # Highest occupancy per group, earliest candidate on ties.
+    best = np.lexsort((cand_minute, -occupancy, cand_group))
+    first_of_group = np.r_[True, cand_group[best][1:] != cand_group[best][:-1]]
+    best = best[first_of_group]
+    best_minute = np.full(len(keys), -1, dtype='int64')
+    best_occupancy = np.zeros(len(keys), dtype='int64')
+    best_minute[cand_group[best]] = cand_minute[best]
+    best_occupancy[cand_group[best]] = occupancy[best]
+    best_minute[best_occupancy <= 0] = -1
+
+    # Groups present in the winning window of their venue-day.
+    window_start = best_minute[group_of]
+    present = (window_start >= 0) & (start < window_start + window_minutes) & (finish > window_start)
+    labels = table['Sport'].astype(str) + " - " + table['Training_Group'].astype(str)
+    groups = (
+        pd.Series(labels.to_numpy()[present], index=group_of[present])
+        .groupby(level=0)
+        .agg(lambda names: sorted(set(names)))
+    )
+
+    keys['Window_Start'] = best_minute
+    keys['Window_End'] = np.where(best_minute >= 0, best_minute + window_minutes, -1)
+    keys['Max_Occupancy'] = best_occupancy
+    keys['Groups'] = [groups.get(i, []) for i in range(len(keys))]
+    return keys[columns]
+
+
+# ----------------------------------------
+# Dense occupancy time series
+OccupancyMatrix = namedtuple('OccupancyMatrix', ['values', 'venues', 'n_days', 'slot_minutes'])
+OccupancyMatrix.__doc__ = """
+Athletes present per venue, day and time slot.
+values: int64 array of shape (len(venues), n_days, slots per day);
+values[v, d, s] counts every session at venues[v] on day offset d that
+overlaps the slot [s * slot_minutes, (s + 1) * slot_minutes).
+"""
+
+SLOT_SIZES = (5, 15, 30)
+
+
+def occupancy_matrix(session_table, counts, slot_minutes=15, n_days=None):
+    """
+    Build the venues x days x slots occupancy matrix in one vectorized pass.
+
+    Each session adds its athlete count at its first slot and subtracts it
+    after its last slot of a difference array; a cumulative sum along the
+    slot axis then gives the occupancy of every slot.
+    :param session_table: table from trainingplan.sessions.build_session_table
+    :param counts: Series of athlete counts aligned with session_table (see athlete_counts)
+    :param slot_minutes: 5, 15 or 30
+    :param n_days: number of day offsets to cover (default: up to the last day in the table)
+    """
+    if slot_minutes not in SLOT_SIZES:
+        raise ValueError(f"slot_minutes must be one of {SLOT_SIZES}, got {slot_minutes}.")
+    n_slots = (24 * 60) // slot_minutes
+
+    valid = (
+        (session_table['Day'] >= 0) & (session_table['Start'] >= 0)
+        & (session_table['Finish'] > session_table['Start']) & session_table['Venue'].notna()
+    )
+    table = session_table[valid]
+    venues = sorted(str(v) for v in table['Venue'].unique())
+    if n_days is None:
+        n_days = int(table['Day'].max()) + 1 if not table.empty else 0
+    table = table[table['Day'] < n_days]
+
+    venue_idx = pd.Index(venues).get_indexer(table['Venue'].astype(str))
+    day_idx = table['Day'].to_numpy(dtype='int64')
+    first_slot = table['Start'].to_numpy(dtype='int64') // slot_minutes
+    # Slot after the one holding the last minute of the session.
+    end_slot = (table['Finish'].to_numpy(dtype='int64') - 1) // slot_minutes + 1
+    weight = counts.reindex(table.index).to_numpy(dtype='int64')
+
+    diff = np.zeros((len(venues), n_days, n_slots + 1), dtype='int64')
+    np.add.at(diff, (venue_idx, day_idx, first_slot), weight)
+    np.add.at(diff, (venue_idx, day_idx, end_slot), -weight)
+    values = np.cumsum(diff[:, :, :n_slots], axis=2)
+    return OccupancyMatrix(values, venues, n_days, slot_minutes)
+
+
+def slot_labels(matrix):
+    """'HH:MM' start time of every slot of the matrix."""
+    return list(HHMM[np.arange(matrix.values.shape[2]) * matrix.slot_minutes])
+
+
+def matrix_peaks(matrix):
+    """Peak occupancy and the first slot reaching it, per venue and day (days without use are left out)."""
+    peak = matrix.values.max(axis=2)
+    peak_slot = matrix.values.argmax(axis=2)
+    venue_idx, day_idx = np.nonzero(peak > 0)
+    return pd.DataFrame({
+        'Venue': [matrix.venues[v] for v in venue_idx],
+        'Day': day_idx,
+        'Slot_Start': peak_slot[venue_idx, day_idx] * matrix.slot_minutes,
+        'Peak': peak[venue_idx, day_idx],
+    })
+
+
+def average_utilisation(matrix, capacity=None):
+    """
+    Mean occupancy per venue and day over the slots in which the venue is used.
+
+    With `capacity` (dict venue -> athletes) the result is a fraction of
+    that capacity instead of a head count; venues missing from it give NaN.
+    """
+    used = matrix.values > 0
+    totals = matrix.values.sum(axis=2)
+    used_slots = used.sum(axis=2)
+    mean = np.where(used_slots > 0, totals / np.maximum(used_slots, 1), 0.0)
+    frame = pd.DataFrame(mean, index=pd.Index(matrix.venues, name='Venue'))
+    if capacity is not None:
+        caps = pd.Series(capacity, dtype='float64').reindex(frame.index)
+        frame = frame.div(caps, axis=0)
+    return frame
+
+
+def heatmap_frame(matrix, day):
+    """Venue x slot occupancy for one day offset, with 'HH:MM' slot columns (ready for st.dataframe)."""
+    return pd.DataFrame(
+        matrix.values[:, day, :],
+        index=pd.Index(matrix.venues, name='Venue'),
+        columns=slot_labels(matrix),
+    )
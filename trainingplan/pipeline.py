@@ -0,0 +1,94 @@
+"""
+Weekly pipeline without any user interface.
+
+Loading a week, cleaning it and building the calendar pivot used to be
+written out in app.py and again in the email job, and importing app.py
+starts the whole Streamlit page. The app, the email job, the batch
+renderer and the command line (python -m trainingplan) all call these
+functions instead; nothing here imports Streamlit.
+"""
+import os
+from collections import namedtuple
+from datetime import timedelta
+
+from trainingplan.delta import load_sessions_incremental
+from trainingplan.instrument import stage
+from trainingplan.layout import CALENDAR_LAYOUT
+from trainingplan.occupancy import WINDOW_MINUTES
+from trainingplan.render import render_reports
+from trainingplan.sessions import DAY_ORDER, calendar_sessions, session_pivot
+from trainingplan.template import EXCEL_WRITER
+
+PreparedWeek = namedtuple('PreparedWeek', ['start_date', 'pivot', 'filtered', 'delta'])
+PreparedWeek.__doc__ = """
+One week ready for rendering.
+pivot: calendar cells per (Sport, Training_Group) and day/AM-PM (see session_pivot).
+filtered: cleaned sessions of the week, sorted for the calendar (see calendar_sessions).
+delta: SessionDelta of the fetch against the session store.
+"""
+
+
+def upcoming_sunday(day):
+    """`day` itself when it is a Sunday, otherwise the next Sunday."""
+    return day + timedelta(days=(6 - day.weekday()) % 7)
+
+
+def week_end(start_date):
+    """Last day (Saturday for a Sunday start) of the week starting on start_date."""
+    return start_date + timedelta(days=6)
+
+
+def report_names(start_date):
+    """File names of one week's reports, as offered by the app's download buttons."""
+    stamp = start_date.strftime('%d%b%Y')
+    return (f"Training_Report_{stamp}.xlsx", f"Venue_Usage_Report_{stamp}.docx",
+            f"Max_Occupancy_Report_{stamp}.docx")
+
+
+def load_week(start_date, **kwargs):
+    """
+    Sessions of the week starting on start_date, diffed against the session store.
+    :param kwargs: passed to load_sessions_incremental (session, url, cache_dir, ...)
+    :return: (sessions, SessionDelta)
+    """
+    return load_sessions_incremental(start_date=start_date, end_date=week_end(start_date), **kwargs)
+
+
+def filter_week(df, start_date):
+    """Sessions of the week kept for the reports (see calendar_sessions)."""
+    return calendar_sessions(df[(df['Date'] >= start_date) & (df['Date'] <= week_end(start_date))])
+
+
+def prepare_week(start_date, **kwargs):
+    """
+    Load, clean and pivot one week.
+    :return: PreparedWeek
+    """
+    sessions, delta = load_week(start_date, **kwargs)
+    with stage("filter") as record:
+        filtered_df = filter_week(sessions, start_date)
+        record.rows = len(filtered_df)
+    with stage("pivot") as record:
+        pivot_df = session_pivot(filtered_df, DAY_ORDER)
+        record.rows = len(pivot_df)
+    return PreparedWeek(start_date, pivot_df, filtered_df, delta)
+
+
+def build_week(start_date, out_dir, layout=CALENDAR_LAYOUT, executor="thread",
+               window_minutes=WINDOW_MINUTES, writer=EXCEL_WRITER, **kwargs):
+    """
+    Build the Excel calendar and both Word reports of one week into out_dir.
+    :return: (PreparedWeek, ReportBundle, paths of the written files)
+    """
+    week = prepare_week(start_date, **kwargs)
+    reports = render_reports(week.pivot, week.filtered, start_date, layout,
+                             executor=executor, window_minutes=window_minutes, writer=writer)
+    with stage("write"):
+        os.makedirs(out_dir, exist_ok=True)
+        paths = []
+        for name, data in zip(report_names(start_date), (reports.excel, reports.venue_usage, reports.max_occupancy)):
+            path = os.path.join(out_dir, name)
+            with open(path, "wb") as f:
+                f.write(data.getvalue())
+            paths.append(path)
+    return week, reports, paths
@@ -0,0 +1,75 @@
+"""
+Concurrent rendering of the three weekly reports.
+
+Once the week's cleaned sessions (filtered_df) and calendar pivot are
+ready, the Excel calendar, the venue usage report and the max occupancy
+report only read them, so render_reports runs the three renderers at the
+same time in a thread pool (or a process pool, with executor="process")
+instead of one after another. Wall-clock time becomes the slowest report
+rather than the sum; the time each stage took is returned with the files.
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from trainingplan.instrument import Stage, active_profile, stage
+from trainingplan.occupancy import WINDOW_MINUTES
+from trainingplan.reports import max_occupancy_report, venue_usage_report
+from trainingplan.template import EXCEL_WRITER, render_calendar
+
+ReportBundle = namedtuple('ReportBundle', ['excel', 'venue_usage', 'max_occupancy', 'missing', 'timings'])
+ReportBundle.__doc__ = """
+Rendered reports of one week.
+excel / venue_usage / max_occupancy: BytesIO of the .xlsx and the two .docx files.
+missing: rows_to_paste entries without data in the pivot.
+timings: seconds per stage ('excel', 'venue_usage', 'max_occupancy') plus 'total' wall time.
+"""
+
+EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
+
+def _timed(name, function, *args):
+    # A standalone Stage: in a process pool the worker cannot see the caller's profile,
+    # so the measurements travel back with the result and are recorded by the caller.
+    record = Stage(f"render.{name}")
+    record.start()
+    try:
+        result = function(*args)
+    finally:
+        record.stop()
+    return result, record
+
+
+def render_reports(pivot_df, filtered_df, start_date, rows_to_paste,
+                   executor="thread", window_minutes=WINDOW_MINUTES, writer=EXCEL_WRITER):
+    """
+    Render the Excel calendar, venue usage and max occupancy reports concurrently.
+    :param executor: "thread" (default) or "process"; a process pool pays for pickling the
+                     frames and a fresh template cache per worker, so it only helps for very large weeks
+    :return: ReportBundle
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor must be one of {sorted(EXECUTORS)}, got {executor!r}.")
+
+    with stage("render") as total:
+        with EXECUTORS[executor](max_workers=3) as pool:
+            excel = pool.submit(_timed, "excel", render_calendar, pivot_df, rows_to_paste, start_date, writer)
+            venue = pool.submit(_timed, "venue_usage", venue_usage_report, filtered_df, start_date, rows_to_paste)
+            occupancy = pool.submit(
+                _timed, "max_occupancy", max_occupancy_report, filtered_df, start_date, rows_to_paste, window_minutes
+            )
+            (excel_file, missing), excel_stage = excel.result()
+            venue_file, venue_stage = venue.result()
+            occupancy_file, occupancy_stage = occupancy.result()
+
+        profile = active_profile()
+        if profile is not None:
+            for record in (excel_stage, venue_stage, occupancy_stage):
+                profile.add(record)
+
+    timings = {
+        'excel': excel_stage.wall,
+        'venue_usage': venue_stage.wall,
+        'max_occupancy': occupancy_stage.wall,
+        'total': total.wall,
+    }
+    return ReportBundle(excel_file, venue_file, occupancy_file, missing, timings)
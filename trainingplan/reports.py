@@ -0,0 +1,239 @@
+"""
+Word reports built from the week's filtered sessions.
+
+The venue usage report used to filter the whole DataFrame once per venue
+(converting every Venue value to str each time) and then render rows
+with iterrows, i.e. O(venues x rows) of Python work. venue_sessions sorts
+the week once by (venue, Date, Start_Time), splits it into venues in a
+single groupby pass and hands the rows over as plain tuples, so building
+the document scales linearly with the number of sessions.
+
+Table bodies are emitted by append_rows: the XML of all rows is built as
+one string, with the cell properties (width plus day shading) prebuilt
+once per column and colour, and parsed in a single call. It produces the
+same XML as table.add_row(), cell.text and set_cell_background, without
+creating python-docx proxy objects and OxmlElements for every cell.
+"""
+from io import BytesIO
+from itertools import repeat
+from xml.sax.saxutils import escape
+
+import numpy as np
+from docx import Document
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.oxml import OxmlElement, parse_xml
+from docx.oxml.ns import nsdecls, qn
+
+from trainingplan.occupancy import WINDOW_MINUTES, athlete_counts, peak_occupancy
+from trainingplan.sessions import build_session_table, format_day, format_minute
+
+DEFAULT_ATHLETE_COUNT = 10
+VENUES_PER_PAGE = 5
+VENUE_COLUMNS = ['Date', 'Start_Time', 'Finish_Time', 'Training_Group', 'Sport']
+VENUE_HEADER = ['Date', 'Time', 'Training Group', 'Sport', 'Athletes']
+HEADER_COLOR = "ADD8E6"  # light blue
+DAY_COLORS = {
+    "Sunday": "D3D3D3",
+    "Monday": "FFFFFF",
+    "Tuesday": "D3D3D3",
+    "Wednesday": "FFFFFF",
+    "Thursday": "D3D3D3",
+    "Friday": "FFFFFF",
+    "Saturday": "D3D3D3"
+}
+
+
+def set_cell_background(cell, color):
+    """
+    Set the background shading color for a cell.
+    :param cell: a docx.table._Cell object
+    :param color: Hex color string (e.g., "ADD8E6" for light blue)
+    """
+    tc = cell._tc
+    tcPr = tc.get_or_add_tcPr()
+    shd = OxmlElement('w:shd')
+    shd.set(qn('w:val'), 'clear')
+    shd.set(qn('w:color'), 'auto')
+    shd.set(qn('w:fill'), color)
+    tcPr.append(shd)
+
+
+def _text_xml(text):
+    """Run content for `text`, split the way python-docx's cell.text does (tabs and line breaks)."""
+    parts = []
+    buffer = []
+
+    def flush():
+        if buffer:
+            chunk = "".join(buffer)
+            space = ' xml:space="preserve"' if chunk.strip() != chunk else ''
+            parts.append(f"<w:t{space}>{escape(chunk)}</w:t>")
+            buffer.clear()
+
+    for char in text:
+        if char == "\t":
+            flush()
+            parts.append("<w:tab/>")
+        elif char in "\r\n":
+            flush()
+            parts.append("<w:br/>")
+        else:
+            buffer.append(char)
+    flush()
+    return f"<w:r>{''.join(parts)}</w:r>" if parts else "<w:r/>"
+
+
+def append_rows(table, rows, fills=None):
+    """
+    Append many rows to a python-docx table with one XML parse.
+    :param rows: iterable of row texts (one string per column)
+    :param fills: optional iterable of hex shading colours, one per row (None for no shading)
+    """
+    widths = [grid_col.w for grid_col in table._tbl.tblGrid.gridCol_lst]
+    cell_props = {}  # (column, fill) -> prebuilt <w:tcPr>
+    runs = {}        # text -> <w:r> (dates, times and group names repeat a lot)
+
+    def props(column, fill):
+        key = (column, fill)
+        if key not in cell_props:
+            width = widths[column] if column < len(widths) else None
+            inner = f'<w:tcW w:type="dxa" w:w="{width.twips}"/>' if width is not None else ''
+            if fill is not None:
+                inner += f'<w:shd w:val="clear" w:color="auto" w:fill="{fill}"/>'
+            cell_props[key] = f"<w:tcPr>{inner}</w:tcPr>" if inner else ''
+        return cell_props[key]
+
+    if fills is None:
+        fills = repeat(None)
+    xml = [f"<w:tbl {nsdecls('w')}>"]
+    for texts, fill in zip(rows, fills):
+        xml.append("<w:tr>")
+        for column, text in enumerate(texts):
+            run = runs.get(text)
+            if run is None:
+                run = runs[text] = _text_xml(text)
+            xml.append(f"<w:tc>{props(column, fill)}<w:p>{run}</w:p></w:tc>")
+        xml.append("</w:tr>")
+    xml.append("</w:tbl>")
+    table._tbl.extend(list(parse_xml("".join(xml))))
+
+
+def venue_sessions(filtered_df):
+    """
+    Sessions of every venue ordered by Date and Start_Time, from one sort and one groupby.
+
+    Venues are compared as text, like the old str(x) == venue filter.
+    :return: list of (venue, [(Date, Start_Time, Finish_Time, Training_Group, Sport), ...])
+             in sorted venue order
+    """
+    venues = sorted(str(v) for v in filtered_df['Venue'].dropna().unique())
+    if not venues:
+        return []
+    venue_text = filtered_df['Venue'].astype(str)
+    rows = filtered_df.loc[venue_text.isin(venues), VENUE_COLUMNS].assign(_Venue=venue_text)
+    # Multi-column sort_values is a stable lexsort: within a venue, rows keep
+    # the order a per-venue sort_values(['Date', 'Start_Time']) gave them.
+    rows = rows.sort_values(['_Venue', 'Date', 'Start_Time'])
+
+    records = list(rows[VENUE_COLUMNS].itertuples(index=False, name=None))
+    sizes = rows.groupby('_Venue', sort=False).size()
+    bounds = np.r_[0, np.cumsum(sizes.to_numpy())]
+    by_venue = {venue: records[bounds[i]:bounds[i + 1]] for i, venue in enumerate(sizes.index)}
+    return [(venue, by_venue.get(venue, [])) for venue in venues]
+
+
+def venue_usage_report(filtered_df, start_date, rows_to_paste):
+    """
+    Word document listing every session per venue, 5 venues per page, shaded by day.
+    :param rows_to_paste: layout list providing "athlete_count" per (sport, training_group)
+    :return: BytesIO with the .docx
+    """
+    doc = Document()
+    section = doc.sections[0]
+    section.orientation = 1  # Landscape
+    new_width, new_height = section.page_height, section.page_width
+    section.page_width = new_width
+    section.page_height = new_height
+
+    title = doc.add_heading('Venue Usage Report', level=1)
+    title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    doc.add_paragraph(f'Week Beginning: {start_date.strftime("%d %b %Y")}', style='Normal')
+
+    athlete_count_map = {
+        (row["sport"], row["training_group"]): row.get("athlete_count", DEFAULT_ATHLETE_COUNT)
+        for row in rows_to_paste
+    }
+
+    for i, (venue, sessions) in enumerate(venue_sessions(filtered_df)):
+        if i and i % VENUES_PER_PAGE == 0:
+            doc.add_page_break()
+        venue_heading = doc.add_heading(f'📍 {venue}', level=2)
+        venue_heading.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+
+        table = doc.add_table(rows=1, cols=len(VENUE_HEADER))
+        table.style = 'Table Grid'
+        for cell, text in zip(table.rows[0].cells, VENUE_HEADER):
+            cell.text = text
+            cell.paragraphs[0].runs[0].bold = True
+            cell.paragraphs[0].alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+            set_cell_background(cell, HEADER_COLOR)
+
+        rows, fills = [], []
+        for date, start_time, finish_time, training_group, sport in sessions:
+            training_group, sport = str(training_group), str(sport)
+            rows.append((
+                date.strftime('%A %d %b %Y'),
+                f"{start_time} - {finish_time}",
+                training_group,
+                sport,
+                str(athlete_count_map.get((sport, training_group), DEFAULT_ATHLETE_COUNT)),
+            ))
+            fills.append(DAY_COLORS.get(date.strftime('%A'), "FFFFFF"))
+        append_rows(table, rows, fills)
+
+    output = BytesIO()
+    doc.save(output)
+    output.seek(0)
+    return output
+
+
+def max_occupancy_report(filtered_df, start_date, rows_to_paste, window_minutes=WINDOW_MINUTES):
+    """
+    Word document with, per date and venue, the busiest window and the groups in it.
+    :param rows_to_paste: layout list providing "athlete_count" per (sport, training_group)
+    :return: BytesIO with the .docx
+    """
+    # Compact table: Day is an int offset from start_date, Start/Finish are int minutes.
+    session_table = build_session_table(filtered_df, start_date)
+    counts = athlete_counts(session_table, rows_to_paste)
+
+    # Sweep-line peak per Date and Venue (see trainingplan.occupancy).
+    peaks = peak_occupancy(session_table, counts, window_minutes=window_minutes)
+
+    doc = Document()
+    doc.add_heading("Maximum Occupancy Report", level=1)
+    doc.add_paragraph(f"Week Beginning: {start_date.strftime('%d %b %Y')}")
+
+    table = doc.add_table(rows=1, cols=5)
+    table.style = 'Table Grid'
+    header = ["Date", "Venue", f"{window_minutes}-min Interval", "Max Occupancy", "Groups"]
+    for cell, text in zip(table.rows[0].cells, header):
+        cell.text = text
+        cell.paragraphs[0].runs[0].bold = True
+        cell.paragraphs[0].alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+
+    append_rows(table, (
+        (
+            format_day(start_date, day),
+            venue,
+            f"{format_minute(window_start)} - {format_minute(window_end)}" if window_start >= 0 else "N/A",
+            str(max_occupancy),
+            ", ".join(groups) if groups else "N/A",
+        )
+        for day, venue, window_start, window_end, max_occupancy, groups in peaks.itertuples(index=False)
+    ))
+
+    output = BytesIO()
+    doc.save(output)
+    output.seek(0)
+    return output
@@ -0,0 +1,150 @@
+"""
+Compact internal session table.
+
+The cleaned report keeps times as 'HH:MM' text and dates as datetime.date
+objects, which every stage used to parse again with strptime. The
+session table holds the same sessions with times as integer minutes
+since midnight and dates as integer day offsets from the start of the
+week, so sorting and overlap checks are plain integer comparisons. Only
+the Excel/Word rendering turns them back into text (see format_day and
+trainingplan.times.HHMM).
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from trainingplan.times import HHMM, MINUTES_PER_DAY
+
+TEXT_COLUMNS = ['Sport', 'Training_Group', 'Venue', 'Session_Type', 'AM/PM']
+
+
+def build_session_table(filtered_df, start_date):
+    """
+    Build the compact session table from the cleaned, week-filtered DataFrame.
+
+    Columns: Sport, Training_Group, Venue, Session_Type, AM/PM (categorical),
+    Day (int16 day offset from start_date, -1 when the date is missing),
+    Start and Finish (int16 minutes since midnight, -1 when missing).
+    Needs the Start_Minutes/Finish_Minutes columns from add_local_times.
+    """
+    table = pd.DataFrame(index=filtered_df.index)
+    for col in TEXT_COLUMNS:
+        if col in filtered_df.columns:
+            table[col] = filtered_df[col].astype('category')
+
+    dates = pd.to_datetime(filtered_df['Date'], errors='coerce')
+    days = (dates - pd.Timestamp(start_date)).dt.days
+    table['Day'] = days.fillna(-1).astype('int16')
+    table['Start'] = filtered_df['Start_Minutes'].fillna(-1).astype('int16')
+    table['Finish'] = filtered_df['Finish_Minutes'].fillna(-1).astype('int16')
+    return table
+
+
+def format_day(start_date, day, fmt="%A %d %b %Y"):
+    """Render a day offset from the session table back to text."""
+    return (start_date + timedelta(days=int(day))).strftime(fmt)
+
+
+def format_minute(minute):
+    """Render minutes since midnight as 'HH:MM' (wraps past midnight like datetime did)."""
+    return HHMM[int(minute) % MINUTES_PER_DAY]
+
+
+# ----------------------------------------
+# Training calendar cell text
+DAY_ORDER = [
+    f"{day} {time}"
+    for day in ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+    for time in ['AM', 'PM']
+]
+GROUP_KEYS = ['Sport', 'Training_Group', 'Day_AM/PM', 'Session_Type']
+
+
+def day_am_pm(df):
+    """'Sunday AM'-style label per row ('' when the date is missing)."""
+    dates = pd.to_datetime(df['Date'], errors='coerce')
+    label = dates.dt.strftime('%A') + " " + df['AM/PM'].astype(str)
+    return label.where(dates.notna() & df['AM/PM'].notna(), '')
+
+
+def calendar_sessions(df):
+    """
+    Sessions shown in the calendar and the reports, sorted for the calendar.
+
+    Drops rows without a sport, the AASMC venue, Generic_Athlete and
+    Practice, blanks missing AM/PM and Session_Type values and adds the
+    Day_AM/PM label.
+    """
+    df = df[df['Sport'].notna() & (df['Sport'].astype(str).str.strip() != '')]
+    df = df[df['Venue'] != 'AASMC']
+    df = df[df['Sport'] != 'Generic_Athlete']
+    df = df[df['Training_Group'] != 'Practice']
+    df = df.assign(**{
+        'AM/PM': df['AM/PM'].fillna('').astype(str),
+        'Session_Type': df['Session_Type'].fillna('').astype(str),
+    })
+    df['Day_AM/PM'] = day_am_pm(df)
+    return df.dropna(subset=['Sport']).sort_values(by=['Date', 'Sport', 'Coach', 'AM/PM'])
+
+
+def _text(series):
+    return series.astype(object).where(series.notna(), '').astype(str)
+
+
+def session_pivot(filtered_df, day_order=DAY_ORDER):
+    """
+    Training calendar cells: one row per (Sport, Training_Group), one column per day_order entry.
+
+    Same text as grouping by GROUP_KEYS, formatting every group with
+    format_session and joining the groups of a cell with pivot_table:
+    each session is "Venue\nStart-Finish" ("Competition\n..." for
+    competitions) ordered by start time, and a Training Camp group is just
+    "TRAINING CAMP". Instead of running Python per group, the keys are
+    factorized once, the session strings are built column-wise, the lines
+    are sorted once on integer codes and a single join per cell builds the
+    text.
+    """
+    columns = pd.Index(['Sport', 'Training_Group'] + list(day_order), name='Day_AM/PM')
+    df = filtered_df.dropna(subset=GROUP_KEYS)
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    venue = _text(df['Venue'])
+    start = _text(df['Start_Time'])
+    finish = _text(df['Finish_Time'])
+    session_type = df['Session_Type'].astype(str)
+    time_str = (start + "-" + finish).where((start != '') | (finish != ''), '')
+    entry = (venue + "\n" + time_str).where(session_type != "Competition", "Competition\n" + venue + "\n" + time_str)
+    entry = entry.str.strip().to_numpy(dtype=object)
+
+    # Sorted integer codes: groups follow the old groupby order, and a cell
+    # (Sport, Training_Group, Day_AM/PM) is a prefix of its groups' keys.
+    group = df.groupby(GROUP_KEYS, sort=True).ngroup().to_numpy()
+    cell = df.groupby(GROUP_KEYS[:3], sort=True).ngroup().to_numpy()
+    minute = df['Start_Minutes'].astype('float64').fillna(-1).to_numpy()
+    camp = (session_type == "Training Camp").to_numpy()
+
+    # A Training Camp group is a single "TRAINING CAMP" line.
+    _, camp_first = np.unique(np.where(camp, group, -1), return_index=True)
+    camp_rows = camp_first[camp[camp_first]]
+    # Other groups contribute their non-empty entries; a group without any
+    # still contributes one empty line, exactly like the old "" result.
+    entry_rows = np.flatnonzero(~camp & (entry != ''))
+    _, regular_first = np.unique(np.where(camp, -1, group), return_index=True)
+    regular_first = regular_first[~camp[regular_first]]
+    empty_rows = regular_first[~np.isin(group[regular_first], group[entry_rows])]
+
+    rows = np.concatenate([camp_rows, entry_rows, empty_rows])
+    text = np.concatenate([
+        np.full(len(camp_rows), "TRAINING CAMP", dtype=object),
+        entry[entry_rows],
+        np.full(len(empty_rows), '', dtype=object),
+    ])
+    order = np.lexsort((rows, minute[rows], group[rows]))
+    cells = pd.Series(text[order]).groupby(cell[rows][order], sort=True).agg("\n".join)
+
+    keys = df[GROUP_KEYS[:3]].iloc[np.unique(cell, return_index=True)[1]]
+    cells.index = pd.MultiIndex.from_frame(keys)
+    pivot_df = cells.unstack('Day_AM/PM', fill_value=' ').reset_index()
+    return pivot_df.reindex(columns=columns, fill_value=' ')
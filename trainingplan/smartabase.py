@@ -0,0 +1,354 @@
+"""
+Fetching and parsing of the PYTHON6_TRAINING_PLAN Smartabase report.
+
+The report is a single HTML table holding the whole academy history.
+Instead of loading the body into memory and handing it to pd.read_html,
+the table is parsed incrementally from response.iter_content: each <tr>
+is turned into a list of cell strings, released from the lxml tree, and
+batched into small typed DataFrame chunks. Cell texts, <br> line breaks
+and colspan / rowspan cells come out as pd.read_html gives them.
+"""
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+from lxml import etree
+
+from trainingplan.cache import CACHE_DIR, CACHE_TTL_SECONDS, iter_cached_report, refresh_cached_report
+from trainingplan.fetch import ReportClient, as_client, restarting
+from trainingplan.instrument import stage, timed_chunks
+from trainingplan.times import add_local_times
+
+LIVE_REPORT_URL = "https://aspire.smartabase.com/aspireacademy/live?report=PYTHON6_TRAINING_PLAN&updategroup=true"
+# TRAININGPLAN_REPORT_URL points the app, the email job and the command line at another server,
+# e.g. the local stand-in (python -m benchmarks.standin).
+REPORT_URL = os.environ.get("TRAININGPLAN_REPORT_URL", LIVE_REPORT_URL)
+REPORT_AUTH = ("sb_sap.etl", "A1s2p3!re")
+
+# Only these report columns are used by the reports; everything else is dropped while parsing.
+REPORT_COLUMNS = [
+    'Sport', 'Training Group', 'Date', 'AM/PM', 'Day AM/PM', 'Venue',
+    'Start Time', 'Finish Time', 'Session Type', 'Coach',
+]
+# Millisecond timestamps, converted to numbers per chunk.
+NUMERIC_COLUMNS = ['Start Time', 'Finish Time']
+
+CHUNK_ROWS = 5000
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+# Same whitespace normalisation pd.read_html applies to each cell.
+_RE_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+
+
+def _cell_text(cell):
+    # Plain <td>text</td> cells (the common case) skip the itertext walk.
+    if len(cell) == 0:
+        text = cell.text
+    else:
+        # pd.read_html reads a <br> as a line break, i.e. one space after normalisation.
+        for br in cell.iter("br"):
+            br.tail = "\n" + (br.tail or "")
+        text = "".join(cell.itertext())
+    if not text:
+        return None
+    text = _RE_WHITESPACE.sub(" ", text.strip())
+    return text if text else None
+
+
+def _span(cell, name):
+    try:
+        return max(int(cell.get(name) or 1), 1)
+    except ValueError:
+        return 1
+
+
+def _expand_spans(cells, carried):
+    """
+    Cell texts of one row with colspan / rowspan cells repeated, as pd.read_html does.
+    :param carried: [(column, text, rows left)] of rowspan cells from the rows above
+    :return: (texts, carried for the next row)
+    """
+    texts = []
+    carry_on = []
+    for cell in cells:
+        while carried and carried[0][0] <= len(texts):
+            _, text, rows = carried.pop(0)
+            if rows > 1:
+                carry_on.append((len(texts), text, rows - 1))
+            texts.append(text)
+        text = _cell_text(cell)
+        rowspan = _span(cell, "rowspan")
+        for _ in range(_span(cell, "colspan")):
+            if rowspan > 1:
+                carry_on.append((len(texts), text, rowspan - 1))
+            texts.append(text)
+    for _, text, rows in carried:
+        if rows > 1:
+            carry_on.append((len(texts), text, rows - 1))
+        texts.append(text)
+    return texts, carry_on
+
+
+def _unique_names(header):
+    # Repeated column names get .1, .2, ... like pd.read_html's columns.
+    seen = {}
+    names = []
+    for name in header:
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def iter_table_rows(byte_chunks, columns=None):
+    """
+    Yield the rows of the first HTML table in a stream of bytes.
+
+    The first yielded row is the full header (the first row of the table,
+    <th> or <td> cells), every following row is a list of cell strings
+    (None for empty cells). With `columns`, data rows only hold those
+    columns that exist in the header, in the order given, and the other
+    cells are never read. Parsed rows are removed from the tree straight
+    away so memory does not grow with the size of the table.
+    :param byte_chunks: iterable of bytes, e.g. response.iter_content()
+    """
+    parser = etree.HTMLPullParser(events=("start", "end"), tag=("table", "tr"))
+    depth = 0
+    header_seen = False
+    finished = False
+    positions = None
+    carried = []
+    # Span attributes are rare; rows are only checked for them once "span" shows up in the stream.
+    spans = False
+    tail = b""
+
+    for chunk in byte_chunks:
+        if not chunk:
+            continue
+        if not spans:
+            spans = b"span" in (tail + chunk).lower()
+            tail = chunk[-8:]
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if finished:
+                continue
+            if element.tag == "table":
+                if event == "start":
+                    depth += 1
+                else:
+                    depth -= 1
+                    finished = depth == 0
+                continue
+            # Only direct rows of the first table; nested tables are ignored.
+            if event != "end" or depth != 1:
+                continue
+
+            cells = [c for c in element if c.tag in ("td", "th")]
+            if not cells and not carried:
+                values = None
+            elif carried or spans and any(c.get("colspan") or c.get("rowspan") for c in cells):
+                values, carried = _expand_spans(cells, carried)
+                if positions is not None:
+                    values = [values[p] if p < len(values) else None for p in positions]
+            elif positions is None:
+                values = [_cell_text(c) for c in cells]
+            else:
+                values = [_cell_text(cells[p]) if p < len(cells) else None for p in positions]
+
+            if not header_seen and values is not None:
+                header_seen = True
+                header = _unique_names([text or "" for text in values])
+                if columns is not None:
+                    positions = [header.index(c) for c in columns if c in header]
+                yield header
+                values = None
+
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+            if values is not None:
+                yield values
+        if finished:
+            break
+    parser.close()
+
+
+def _rows_to_frame(rows, columns):
+    data = {name: [row[pos] for row in rows] for pos, name in enumerate(columns)}
+    frame = pd.DataFrame(data, columns=columns, dtype=object)
+    # Empty cells are NaN, as with pd.read_html.
+    frame = frame.where(frame.notna(), np.nan)
+    for col in NUMERIC_COLUMNS:
+        if col in frame.columns:
+            frame[col] = pd.to_numeric(frame[col], errors='coerce')
+    return frame
+
+
+def date_window_filter(start_date, end_date, dayfirst=True):
+    """
+    Build a predicate telling whether a raw 'Date' cell falls in start_date..end_date.
+
+    Report dates repeat for every session on that day, so each distinct
+    string is only parsed once. Unparseable dates are rejected, the same
+    as the NaT rows the old post-parse filter dropped.
+    """
+    parsed = {}
+
+    def in_window(text):
+        if text not in parsed:
+            value = pd.to_datetime(text, errors='coerce', dayfirst=dayfirst) if text else pd.NaT
+            parsed[text] = pd.notnull(value) and start_date <= value.date() <= end_date
+        return parsed[text]
+
+    return in_window
+
+
+def iter_report_frames(byte_chunks, columns=None, chunk_rows=CHUNK_ROWS,
+                       start_date=None, end_date=None, dayfirst=True):
+    """
+    Parse the report table incrementally and yield DataFrame chunks.
+
+    Each chunk only holds `columns` (default REPORT_COLUMNS, missing
+    columns are skipped) with NUMERIC_COLUMNS already converted to numbers.
+    When start_date and end_date are given, rows whose 'Date' is outside
+    that window are dropped while parsing and never reach a DataFrame.
+    """
+    wanted = list(REPORT_COLUMNS if columns is None else columns)
+    windowed = start_date is not None and end_date is not None
+    # 'Date' is always read when filtering, even if the caller does not keep it.
+    extract = wanted + ['Date'] if windowed and 'Date' not in wanted else wanted
+
+    rows = iter_table_rows(byte_chunks, extract)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("No table found in the Smartabase report.")
+    present = [c for c in extract if c in header]
+    keep = [c for c in wanted if c in header]
+
+    in_window = None
+    if windowed:
+        if 'Date' not in header:
+            raise ValueError("Cannot filter by date: the report has no 'Date' column.")
+        date_pos = present.index('Date')
+        in_window = date_window_filter(start_date, end_date, dayfirst)
+
+    batch = []
+    for row in rows:
+        if in_window is not None and not in_window(row[date_pos]):
+            continue
+        batch.append(row)
+        if len(batch) >= chunk_rows:
+            yield _rows_to_frame(batch, keep)
+            batch = []
+    # Always yield the last (possibly empty) chunk so callers get the columns.
+    yield _rows_to_frame(batch, keep)
+
+
+def read_report(byte_chunks, columns=None, chunk_rows=CHUNK_ROWS,
+                start_date=None, end_date=None, dayfirst=True):
+    """Parse the whole report stream into one DataFrame (only the needed columns and dates)."""
+    frames = list(iter_report_frames(byte_chunks, columns, chunk_rows, start_date, end_date, dayfirst))
+    non_empty = [f for f in frames if not f.empty]
+    if not non_empty:
+        return frames[-1]
+    return pd.concat(non_empty, ignore_index=True)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def report_client():
+    """The process-wide ReportClient for the Smartabase report (pooled connections, timeouts, retries)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ReportClient(auth=REPORT_AUTH)
+        return _client
+
+
+def report_session():
+    """The pooled requests.Session of report_client(), authenticated for the Smartabase report."""
+    return report_client().session
+
+
+def report_payload_hash(session=None, url=REPORT_URL, cache_dir=CACHE_DIR, cache_ttl=CACHE_TTL_SECONDS):
+    """
+    SHA-256 of the current report payload, downloading or revalidating the cached copy when it is stale.
+    Cheap (one small JSON read) while the cached payload is fresh; used as a cache key for later stages.
+    """
+    client = report_client() if session is None else as_client(session)
+    return refresh_cached_report(client, url, cache_dir, cache_ttl)["sha256"]
+
+
+def fetch_report(session=None, url=REPORT_URL, columns=None, chunk_rows=CHUNK_ROWS,
+                 start_date=None, end_date=None, dayfirst=True,
+                 cache_dir=CACHE_DIR, cache_ttl=CACHE_TTL_SECONDS):
+    """
+    Download the Smartabase report and parse it while it streams in.
+    :param session: optional ReportClient or requests.Session (default: report_client())
+    :param start_date, end_date: optional datetime.date window; other rows are dropped while parsing
+    :param cache_dir: directory of the raw payload cache (None to always download)
+    :param cache_ttl: seconds a cached payload is reused without revalidating it
+    :return: DataFrame with the original report column names
+    """
+    client = report_client() if session is None else as_client(session)
+    parse_options = dict(
+        columns=columns,
+        chunk_rows=chunk_rows,
+        start_date=start_date,
+        end_date=end_date,
+        dayfirst=dayfirst,
+    )
+
+    def download():
+        if cache_dir is not None:
+            chunks = iter_cached_report(client, url, cache_dir=cache_dir, ttl=cache_ttl,
+                                        chunk_size=DOWNLOAD_CHUNK_BYTES)
+            try:
+                return _parse_stage(timed_chunks(chunks, "fetch.download"), parse_options)
+            finally:
+                chunks.close()
+        response = client.get(url)
+        try:
+            response.raise_for_status()
+            chunks = response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES)
+            return _parse_stage(timed_chunks(chunks, "fetch.download"), parse_options)
+        finally:
+            response.close()
+
+    # A body that breaks off and cannot be resumed is downloaded and parsed again from byte 0.
+    return restarting(download)
+
+
+def _parse_stage(chunks, parse_options):
+    # Parsing runs while the payload streams in, so "fetch" includes "fetch.download".
+    with stage("fetch") as record:
+        data = read_report(chunks, **parse_options)
+        record.rows = len(data)
+    return data
+
+
+def clean_report(data, offset_hours=11, dayfirst=True):
+    """
+    Turn the parsed report into the typed session table every report starts from.
+
+    Drops duplicate rows, replaces spaces in column names with underscores,
+    converts Start_Time/Finish_Time to local 'HH:MM' (plus Start_Minutes /
+    Finish_Minutes) and Date to datetime.date. Report-specific filters
+    (venues, sports, groups) are left to the callers.
+    """
+    with stage("clean") as record:
+        df = data.drop(columns=['About'], errors='ignore').drop_duplicates()
+        df.columns = df.columns.astype(str).str.replace(' ', '_')
+        with stage("clean.local_times"):
+            df = add_local_times(df, offset_hours=offset_hours)
+        df['Date'] = pd.to_datetime(df['Date'], errors='coerce', dayfirst=dayfirst).dt.date
+        record.rows = len(df)
+    return df
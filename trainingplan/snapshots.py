@@ -0,0 +1,214 @@
+"""
+Columnar snapshots of the cleaned session table.
+
+Every run that parses the Smartabase report saves the cleaned, typed
+session table (see smartabase.clean_report) as an uncompressed Feather
+file, named after the fetch time, the SHA-256 of the raw payload it came
+from and the date window it was limited to (so a week and a term of the
+same payload are kept side by side), plus "_monthfirst" when the dates
+were parsed month-first (the email job, see load_sessions). A later run
+that sees the same payload in the report cache memory-maps the snapshot
+instead of parsing the HTML again, and ad-hoc analyses can load a whole
+season with load_snapshot().
+
+Several app sessions share snapshot_dir and each prunes it after saving,
+so a snapshot can disappear between listing and reading it: the readers
+skip such files and load_sessions falls back to a fetch.
+"""
+import json
+import os
+import tempfile
+import time
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import feather
+
+from trainingplan.cache import CACHE_DIR, CACHE_TTL_SECONDS, read_cache_meta
+from trainingplan.instrument import stage
+from trainingplan.smartabase import REPORT_URL, clean_report, fetch_report
+
+SNAPSHOT_DIR = os.environ.get(
+    "TRAININGPLAN_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "snapshots"),
+)
+KEEP_SNAPSHOTS = 20
+_META_KEY = b"trainingplan"
+
+
+def snapshot_name(fetched_at, sha256=None, start_date=None, end_date=None, dayfirst=True):
+    """File name of a snapshot: fetch time (UTC), payload hash prefix and date window ('full' for the whole history)."""
+    stamp = datetime.fromtimestamp(fetched_at, tz=timezone.utc).strftime('%Y%m%dT%H%M%S')
+    window = f"{start_date:%Y%m%d}-{end_date:%Y%m%d}" if start_date and end_date else "full"
+    order = "" if dayfirst else "_monthfirst"
+    return f"sessions_{stamp}_{(sha256 or 'nohash')[:12]}_{window}{order}.feather"
+
+
+def save_snapshot(sessions, fetched_at=None, sha256=None, start_date=None, end_date=None,
+                  snapshot_dir=SNAPSHOT_DIR, keep=KEEP_SNAPSHOTS, dayfirst=True):
+    """
+    Write the session table as a Feather snapshot and return its path.
+    :param fetched_at: epoch seconds of the fetch (default: now)
+    :param sha256: hash of the raw payload the table was parsed from
+    :param start_date, end_date: date window the table was limited to (None for the full history)
+    :param keep: number of most recent snapshots to keep in snapshot_dir
+    :param dayfirst: whether the report dates were parsed day-first (see clean_report)
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    fetched_at = time.time() if fetched_at is None else fetched_at
+    path = os.path.join(snapshot_dir, snapshot_name(fetched_at, sha256, start_date, end_date, dayfirst))
+
+    table = pa.Table.from_pandas(sessions, preserve_index=False)
+    meta = {
+        "fetched_at": fetched_at,
+        "sha256": sha256,
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat() if end_date else None,
+        "rows": len(sessions),
+        "dayfirst": dayfirst,
+    }
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _META_KEY: json.dumps(meta).encode()})
+
+    fd, tmp = tempfile.mkstemp(dir=snapshot_dir, suffix=".tmp")
+    os.close(fd)
+    # Uncompressed so the file can be memory-mapped without a decode step.
+    feather.write_feather(table, tmp, compression='uncompressed')
+    os.replace(tmp, path)
+
+    for old in list_snapshots(snapshot_dir)[keep:]:
+        try:
+            os.remove(old["path"])
+        except FileNotFoundError:
+            pass  # Already pruned by another session
+    return path
+
+
+def snapshot_meta(path):
+    """Metadata stored in a snapshot (read from the schema only, without loading the data)."""
+    with pa.memory_map(path) as source:
+        schema = pa.ipc.open_file(source).schema
+    meta = json.loads((schema.metadata or {}).get(_META_KEY, b"{}"))
+    meta["path"] = path
+    return meta
+
+
+def list_snapshots(snapshot_dir=SNAPSHOT_DIR):
+    """Metadata of every snapshot in snapshot_dir, newest first."""
+    if not os.path.isdir(snapshot_dir):
+        return []
+    names = sorted((n for n in os.listdir(snapshot_dir) if n.endswith(".feather")), reverse=True)
+    snapshots = []
+    for name in names:
+        try:
+            snapshots.append(snapshot_meta(os.path.join(snapshot_dir, name)))
+        except FileNotFoundError:
+            continue  # Pruned by another session since os.listdir
+    return snapshots
+
+
+def _covers(meta, start_date, end_date):
+    if meta.get("start_date") is None:
+        return True  # Full history
+    if start_date is None or end_date is None:
+        return False
+    return (date.fromisoformat(meta["start_date"]) <= start_date
+            and end_date <= date.fromisoformat(meta["end_date"]))
+
+
+def find_snapshot(sha256, start_date=None, end_date=None, snapshot_dir=SNAPSHOT_DIR, dayfirst=True):
+    """
+    Path of the newest snapshot of payload `sha256` for start_date..end_date, or None.
+    A snapshot of exactly that window is preferred; otherwise any snapshot covering it.
+    Only snapshots whose dates were parsed with the same `dayfirst` are considered.
+    """
+    window = (start_date.isoformat() if start_date else None, end_date.isoformat() if end_date else None)
+    covering = None
+    for meta in list_snapshots(snapshot_dir):
+        if meta.get("sha256") != sha256 or meta.get("dayfirst", True) != dayfirst:
+            continue
+        if (meta.get("start_date"), meta.get("end_date")) == window:
+            return meta["path"]
+        if covering is None and _covers(meta, start_date, end_date):
+            covering = meta["path"]
+    return covering
+
+
+def restore_missing(sessions):
+    """
+    Arrow nulls come back as None; turn them into NaN (NaT for Date) like
+    the freshly cleaned table. Start_Time/Finish_Time keep None, which is
+    what add_local_times produces for missing times.
+    """
+    for col in sessions.columns:
+        if sessions[col].dtype == object and col not in ('Start_Time', 'Finish_Time'):
+            sessions[col] = sessions[col].where(sessions[col].notna(), pd.NaT if col == 'Date' else np.nan)
+    return sessions
+
+
+def load_snapshot(path=None, start_date=None, end_date=None, snapshot_dir=SNAPSHOT_DIR, memory_map=True):
+    """
+    Load a snapshot (default: the newest one) as a DataFrame.
+
+    The file is memory-mapped, so only the columns pandas converts are read.
+    With start_date/end_date only sessions inside that window are returned.
+    :raises FileNotFoundError: when `path` (or, without it, every snapshot) is gone
+    """
+    if path is None:
+        table = None
+        for meta in list_snapshots(snapshot_dir):
+            try:
+                table = feather.read_table(meta["path"], memory_map=memory_map)
+                break
+            except FileNotFoundError:
+                continue  # Pruned since it was listed, try the next newest
+        if table is None:
+            raise FileNotFoundError(f"No session snapshots in {snapshot_dir}.")
+    else:
+        table = feather.read_table(path, memory_map=memory_map)
+    if start_date is not None and end_date is not None:
+        # Filter on the Arrow date column so only the window is converted to pandas.
+        dates = table.column('Date')
+        table = table.filter(pc.and_(pc.greater_equal(dates, start_date), pc.less_equal(dates, end_date)))
+    return restore_missing(table.to_pandas())
+
+
+def load_sessions(start_date=None, end_date=None, session=None, url=REPORT_URL,
+                  cache_dir=CACHE_DIR, cache_ttl=CACHE_TTL_SECONDS, snapshot_dir=SNAPSHOT_DIR, dayfirst=True):
+    """
+    Cleaned session table for start_date..end_date (or the full history).
+
+    When the report cache still holds a fresh payload that was already
+    parsed into a snapshot, the snapshot is memory-mapped; otherwise the
+    report is fetched, cleaned and saved as a new snapshot.
+    :param dayfirst: parse the report dates day-first (dd/mm/yyyy); the email job passes False
+    """
+    meta = read_cache_meta(url, cache_dir) if cache_dir is not None else None
+    if meta is not None and time.time() - meta.get("fetched_at", 0) < cache_ttl:
+        path = find_snapshot(meta["sha256"], start_date, end_date, snapshot_dir, dayfirst)
+        if path is not None:
+            try:
+                with stage("snapshot.load") as record:
+                    sessions = load_snapshot(path, start_date, end_date)
+                    record.rows = len(sessions)
+                return sessions
+            except FileNotFoundError:
+                pass  # Pruned by another session since find_snapshot; parse the payload again
+
+    data = fetch_report(session=session, url=url, start_date=start_date, end_date=end_date,
+                        dayfirst=dayfirst, cache_dir=cache_dir, cache_ttl=cache_ttl)
+    sessions = clean_report(data, dayfirst=dayfirst)
+    meta = read_cache_meta(url, cache_dir) if cache_dir is not None else None
+    with stage("snapshot.save", rows=len(sessions)):
+        save_snapshot(
+            sessions,
+            fetched_at=meta["fetched_at"] if meta else None,
+            sha256=meta["sha256"] if meta else None,
+            start_date=start_date,
+            end_date=end_date,
+            snapshot_dir=snapshot_dir,
+            dayfirst=dayfirst,
+        )
+    return sessions
@@ -0,0 +1,200 @@
+"""
+Filling the Excel training calendar template from the session pivot.
+
+Every entry of a layout list (rows_to_paste in app.py and the weekly
+email job) names a (sport, training_group) and the template cell where
+its row of day/AM-PM values starts. Instead of filtering the pivot with
+two boolean masks per entry, the pivot is indexed once on
+(Sport, Training_Group) and reindexed against the whole layout: that
+gives the block of cell values for every entry in one step, and the
+entries missing from the pivot are the keys the reindex could not find.
+
+fill_template writes that block and the date / week header cells in a
+single pass. Every cell of one kind shares one Alignment: it is
+registered with the workbook once and each cell only gets its style
+index, instead of a new Alignment object being built and hashed per cell.
+
+The template itself is loaded once per process and kept as a pickled
+pristine copy; new_workbook() unpickles a fresh clone for every report,
+which is far cheaper than copying the file and parsing it again with
+load_workbook, and leaves nothing behind on disk. render_calendar can
+also skip openpyxl altogether and patch the template's sheet XML (see
+trainingplan.xlsxpatch).
+"""
+import logging
+import os
+import pickle
+import threading
+from datetime import timedelta
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import Alignment
+from openpyxl.styles.cell_style import StyleArray
+
+# "ooxml" (trainingplan.xlsxpatch) is opt-in until it has been checked against real weeks.
+EXCEL_WRITER = os.environ.get("TRAININGPLAN_EXCEL_WRITER", "openpyxl")
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Excel_template.xlsx")
+PIVOT_KEYS = ['Sport', 'Training_Group']
+
+logger = logging.getLogger(__name__)
+
+# Shared styles: calendar cells wrap, date headers do not.
+CENTER_WRAP = Alignment(horizontal="center", vertical="center", wrap_text=True)
+CENTER = Alignment(horizontal="center", vertical="center")
+
+# Header cells of the three blocks of the template.
+DATE_CELL_GROUPS = [
+    ['C4', 'E4', 'G4', 'I4', 'K4', 'M4', 'O4'],
+    ['C35', 'E35', 'G35', 'I35', 'K35', 'M35', 'O35'],
+    ['C67', 'E67', 'G67', 'I67', 'K67', 'M67', 'O67'],
+]
+WEEK_CELLS = ["O2", "O33", "O65"]
+
+
+# path -> (mtime, pickled workbook)
+_compiled_templates = {}
+_compiled_lock = threading.Lock()
+
+
+def _compiled_template(path):
+    """Pickled pristine workbook for `path`, rebuilt when the file changes on disk."""
+    mtime = os.path.getmtime(path)
+    with _compiled_lock:
+        entry = _compiled_templates.get(path)
+        if entry is None or entry[0] != mtime:
+            entry = (mtime, pickle.dumps(load_workbook(path), protocol=pickle.HIGHEST_PROTOCOL))
+            _compiled_templates[path] = entry
+    return entry[1]
+
+
+def new_workbook(path=TEMPLATE_PATH):
+    """A private, editable copy of the template workbook (safe to use from concurrent sessions)."""
+    return pickle.loads(_compiled_template(path))
+
+
+def workbook_bytes(workbook):
+    """Save a workbook to a BytesIO, rewound and ready for a download button or attachment."""
+    output = BytesIO()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def cell_position(start_cell):
+    """
+    Split an 'A1'-style cell reference into (row, column) numbers.
+    :raises ValueError: when start_cell is not a column letter followed by a row number (e.g. 'C12')
+    """
+    if not start_cell[:1].isalpha() or not start_cell[1:].isdigit():
+        raise ValueError(f"Invalid start_cell format: '{start_cell}'. Must be like 'C12'.")
+    return int(start_cell[1:]), ord(start_cell[0].upper()) - ord("A") + 1
+
+
+def layout_values(pivot_df, layout):
+    """
+    Cell values of every layout entry, looked up with one reindex.
+    :param pivot_df: pivot with Sport, Training_Group and one column per day/AM-PM
+    :param layout: list of dicts with "sport" and "training_group" keys
+    :return: (values, found): 2-D object array with one row per layout entry
+             (NaN rows for missing entries) and a boolean array marking the
+             entries present in the pivot
+    """
+    keyed = pivot_df.set_index(PIVOT_KEYS)
+    # Like the old pivot_df[mask].iloc[0], the first row of a duplicated key wins.
+    keyed = keyed[~keyed.index.duplicated()]
+    keys = pd.MultiIndex.from_tuples(
+        [(row["sport"], row["training_group"]) for row in layout], names=PIVOT_KEYS
+    )
+    if not len(keys):
+        return np.empty((0, keyed.shape[1]), dtype=object), np.zeros(0, dtype=bool)
+    found = keyed.index.get_indexer(keys) >= 0
+    return keyed.reindex(keys).to_numpy(dtype=object), found
+
+
+def header_cells(start_date):
+    """
+    Date and "Week beginning" header cells for the week starting on start_date.
+    :return: list of (row, column, value, alignment)
+    """
+    cells = []
+    for day_offset, cell_group in enumerate(zip(*DATE_CELL_GROUPS)):
+        date_value = (start_date + timedelta(days=day_offset)).strftime('%a %d %b %Y')
+        cells.extend((*cell_position(cell), date_value, CENTER) for cell in cell_group)
+
+    week_number = start_date.isocalendar()[1]
+    week_beginning_text = f"Week beginning {start_date.strftime('%d %b')}\nWeek {week_number}"
+    cells.extend((*cell_position(cell), week_beginning_text, CENTER_WRAP) for cell in WEEK_CELLS)
+    return cells
+
+
+def calendar_cells(pivot_df, layout):
+    """
+    Calendar cells of every layout entry found in the pivot.
+    :return: (cells, missing): list of (row, column, value, alignment) and
+             the layout entries without data in the pivot (in layout order)
+    """
+    positions = [cell_position(row["start_cell"]) for row in layout]
+    values, found = layout_values(pivot_df, layout)
+    cells = []
+    for i in np.flatnonzero(found):
+        row_num, start_col_idx = positions[i]
+        cells.extend(
+            (row_num, col_idx, value, CENTER_WRAP)
+            for col_idx, value in enumerate(values[i].tolist(), start=start_col_idx)
+        )
+    return cells, [row for row, ok in zip(layout, found) if not ok]
+
+
+def write_cells(sheet, cells):
+    """
+    Write (row, column, value, alignment) cells in one pass.
+
+    Each distinct Alignment is added to the workbook's style table once and
+    its index is copied onto the cells; fonts, borders and fills from the
+    template are left untouched.
+    """
+    alignment_ids = {}
+    for row_num, col_idx, value, alignment in cells:
+        cell = sheet.cell(row=row_num, column=col_idx, value=value)
+        key = id(alignment)
+        if key not in alignment_ids:
+            cell.alignment = alignment
+            alignment_ids[key] = cell._style.alignmentId
+        else:
+            if not cell._style:
+                cell._style = StyleArray()
+            cell._style.alignmentId = alignment_ids[key]
+
+
+def fill_template(workbook, pivot_df, layout, start_date, sheet_name="Template"):
+    """
+    Fill the training calendar template: pivot rows of every layout entry plus the header cells.
+    :return: layout entries without data in the pivot (in layout order)
+    """
+    cells, missing = calendar_cells(pivot_df, layout)
+    write_cells(workbook[sheet_name], header_cells(start_date) + cells)
+    return missing
+
+
+def render_calendar(pivot_df, layout, start_date, writer=EXCEL_WRITER, path=TEMPLATE_PATH):
+    """
+    Render the filled training calendar to an in-memory .xlsx.
+    :param writer: "ooxml" patches the template package directly (trainingplan.xlsxpatch),
+                   "openpyxl" fills a new_workbook() clone; both give the same cells
+    :return: (BytesIO, layout entries without data in the pivot)
+    """
+    if writer == "ooxml":
+        from trainingplan.xlsxpatch import patch_calendar
+        try:
+            return patch_calendar(pivot_df, layout, start_date, path)
+        except ValueError as error:
+            # A layout cell the template sheet does not contain: openpyxl can create it.
+            logger.warning("OOXML writer cannot patch the calendar (%s); falling back to openpyxl.", error)
+    elif writer != "openpyxl":
+        raise ValueError(f"writer must be 'ooxml' or 'openpyxl', got {writer!r}.")
+    workbook = new_workbook(path)
+    missing = fill_template(workbook, pivot_df, layout, start_date)
+    return workbook_bytes(workbook), missing
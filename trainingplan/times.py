@@ -0,0 +1,62 @@
+"""
+Vectorized conversion of Smartabase millisecond timestamps to local times.
+
+Smartabase stores Start Time / Finish Time as epoch milliseconds. The
+old convert_to_time built a datetime and called strftime for every cell;
+here the whole column is converted in one NumPy pass to minutes since
+midnight, and the 'HH:MM' text is looked up from a 1440-entry table.
+"""
+import numpy as np
+import pandas as pd
+
+MINUTES_PER_DAY = 24 * 60
+MS_PER_MINUTE = 60 * 1000
+
+# 'HH:MM' for every minute of the day, indexed by minute.
+HHMM = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(MINUTES_PER_DAY)], dtype=object)
+
+
+def minutes_of_day(timestamp_ms, offset_hours=11):
+    """
+    Local minutes since midnight for epoch-millisecond timestamps.
+
+    Same arithmetic as the old convert_to_time: the timestamp is read as
+    UTC and `offset_hours` is subtracted. Non-numeric values become <NA>.
+    :return: Series of nullable Int16 (aligned to the input index when it is a Series)
+    """
+    index = timestamp_ms.index if isinstance(timestamp_ms, pd.Series) else None
+    ms = pd.to_numeric(pd.Series(timestamp_ms, index=index), errors='coerce').to_numpy(dtype='float64')
+    valid = ~np.isnan(ms)
+    minutes = np.zeros(len(ms), dtype='int64')
+    minutes[valid] = np.floor_divide(ms[valid] - offset_hours * 3600 * 1000, MS_PER_MINUTE) % MINUTES_PER_DAY
+    return pd.Series(pd.arrays.IntegerArray(minutes.astype('int16'), ~valid), index=index)
+
+
+def format_minutes(minutes):
+    """'HH:MM' strings for a Series of minutes since midnight (None where missing)."""
+    minutes = pd.Series(minutes)
+    values = minutes.to_numpy(dtype='float64', na_value=np.nan)
+    valid = ~np.isnan(values)
+    text = np.full(len(values), None, dtype=object)
+    text[valid] = HHMM[values[valid].astype('int64') % MINUTES_PER_DAY]
+    return pd.Series(text, index=minutes.index, dtype=object)
+
+
+def convert_to_time(timestamp_ms, offset_hours=11):
+    """Convert a column of epoch-millisecond timestamps to local 'HH:MM' strings (None where missing)."""
+    return format_minutes(minutes_of_day(timestamp_ms, offset_hours))
+
+
+def add_local_times(df, columns=('Start_Time', 'Finish_Time'), offset_hours=11):
+    """
+    Replace millisecond time columns with local 'HH:MM' strings in one pass.
+
+    A numeric minutes-since-midnight column is kept next to each string
+    column ('Start_Time' -> 'Start_Minutes') so later stages can sort and
+    compare times without parsing the text again.
+    """
+    for col in columns:
+        minutes = minutes_of_day(df[col], offset_hours)
+        df[col.replace('_Time', '_Minutes')] = minutes
+        df[col] = format_minutes(minutes)
+    return df
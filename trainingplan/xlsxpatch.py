@@ -0,0 +1,339 @@
+"""
+Training calendar writer that patches the template's OOXML directly.
+
+The template layout is fixed and only the calendar block and the date /
+week header cells change from week to week, yet openpyxl parses and
+re-serializes the whole workbook (styles, 600 merged ranges, drawings)
+for every report. This writer treats Excel_template.xlsx as a zip:
+
+* the sheet XML is split once into the text between cells and the XML of
+  every cell, so a render only swaps the cells it writes;
+* new strings are appended to the template's shared string table;
+* each (template style, Alignment) pair used by a written cell gets one
+  extra cellXfs entry, exactly what openpyxl does when an alignment is set;
+* every other part of the package is copied through untouched.
+
+The cells written are the same as trainingplan.template.fill_template
+(calendar_cells + header_cells); compare_workbooks / check_equivalence
+load both outputs with openpyxl and report any cell whose value or style
+differs. Run ``python -m trainingplan.xlsxpatch`` for a timed comparison
+on a synthetic week.
+"""
+import os
+import re
+import threading
+import zipfile
+from collections import namedtuple
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from lxml import etree
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import get_column_letter, range_boundaries
+from openpyxl.utils.exceptions import IllegalCharacterError
+
+from trainingplan.template import TEMPLATE_PATH, calendar_cells, header_cells
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_CELL_RE = re.compile(r'<c\b[^>]*?/>|<c\b[^>]*?>.*?</c>', re.S)
+_ATTR_RE = re.compile(r'\s([\w:]+)="([^"]*)"')
+_CELLXFS_RE = re.compile(r'(<cellXfs\b[^>]*?count=")(\d+)("[^>]*>)(.*?)(</cellXfs>)', re.S)
+_XF_RE = re.compile(r'<xf\b[^>]*?/>|<xf\b[^>]*?>.*?</xf>', re.S)
+_SST_COUNTS_RE = re.compile(r'<sst\b[^>]*>')
+
+PatchTemplate = namedtuple('PatchTemplate', [
+    'infos', 'parts', 'sheet_part', 'strings_part', 'styles_part',
+    'sheet_pieces', 'cell_slots', 'covered',
+    'strings', 'string_index', 'sst_head', 'sst_count',
+    'styles_head', 'xfs', 'styles_tail',
+])
+PatchTemplate.__doc__ = """
+Template workbook split for patching (built once per process by compile_template).
+sheet_pieces: sheet XML as [text, cell, text, cell, ..., text]; cell_slots maps
+'C6' -> (index of the cell in sheet_pieces, its style index, whether it holds a shared string).
+covered: cells hidden under a merged range (not writable, like openpyxl's MergedCell).
+"""
+
+# (path, sheet_name) -> (mtime, PatchTemplate)
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def _attrs(tag):
+    return dict(_ATTR_RE.findall(tag[:tag.index('>')]))
+
+
+def _read_rels(parts, path):
+    folder, name = path.rsplit('/', 1) if '/' in path else ('', path)
+    rels = etree.fromstring(parts[f"{folder}/_rels/{name}.rels".lstrip('/')])
+    targets = {}
+    for rel in rels.iter(f"{{{PKG_REL_NS}}}Relationship"):
+        target = rel.get("Target")
+        targets[rel.get("Id")] = (
+            target.lstrip('/') if target.startswith('/') else f"{folder}/{target}".lstrip('/'),
+            rel.get("Type").rsplit('/', 1)[-1],
+        )
+    return targets
+
+
+def compile_template(path=TEMPLATE_PATH, sheet_name="Template"):
+    """Read the template package and split the parts a render touches."""
+    with zipfile.ZipFile(path) as package:
+        infos = package.infolist()
+        parts = {info.filename: package.read(info.filename) for info in infos}
+
+    workbook_rels = _read_rels(parts, "xl/workbook.xml")
+    workbook = etree.fromstring(parts["xl/workbook.xml"])
+    sheet = next(s for s in workbook.iter(f"{{{MAIN_NS}}}sheet") if s.get("name") == sheet_name)
+    sheet_part = workbook_rels[sheet.get(f"{{{REL_NS}}}id")][0]
+    by_type = {kind: target for target, kind in workbook_rels.values()}
+    strings_part, styles_part = by_type["sharedStrings"], by_type["styles"]
+
+    # Sheet: text between cells and the cells themselves.
+    sheet_xml = parts[sheet_part].decode("utf-8")
+    pieces, cell_slots, pos = [], {}, 0
+    for match in _CELL_RE.finditer(sheet_xml):
+        cell = match.group(0)
+        attrs = _attrs(cell)
+        pieces.append(sheet_xml[pos:match.start()])
+        cell_slots[attrs["r"]] = (len(pieces), int(attrs.get("s", 0)), attrs.get("t") == "s")
+        pieces.append(cell)
+        pos = match.end()
+    pieces.append(sheet_xml[pos:])
+
+    covered = set()
+    for ref in re.findall(r'<mergeCell ref="([A-Z0-9:]+)"', sheet_xml):
+        min_col, min_row, max_col, max_row = range_boundaries(ref)
+        covered.update(
+            f"{get_column_letter(col)}{row}"
+            for row in range(min_row, max_row + 1)
+            for col in range(min_col, max_col + 1)
+            if (row, col) != (min_row, min_col)
+        )
+
+    # Shared strings: plain <si><t> entries can be reused by text.
+    sst_xml = parts[strings_part].decode("utf-8")
+    sst = etree.fromstring(parts[strings_part])
+    strings, string_index = [], {}
+    for i, si in enumerate(sst.iter(f"{{{MAIN_NS}}}si")):
+        children = list(si)
+        text = "".join(si.itertext())
+        strings.append(text)
+        if len(children) == 1 and children[0].tag == f"{{{MAIN_NS}}}t":
+            string_index.setdefault(text, i)
+    sst_head = sst_xml[:sst_xml.rindex("</sst>")]
+
+    # Styles: the cellXfs list, split so entries can be appended.
+    styles_xml = parts[styles_part].decode("utf-8")
+    match = _CELLXFS_RE.search(styles_xml)
+    xfs = _XF_RE.findall(match.group(4))
+
+    return PatchTemplate(
+        infos, parts, sheet_part, strings_part, styles_part,
+        pieces, cell_slots, frozenset(covered),
+        strings, string_index, sst_head, int(sst.get("count", len(strings))),
+        styles_xml[:match.start()], xfs, styles_xml[match.end():],
+    )
+
+
+def _template(path, sheet_name):
+    """Compiled template for (path, sheet_name), rebuilt when the file changes on disk."""
+    mtime = os.path.getmtime(path)
+    with _templates_lock:
+        key = (path, sheet_name)
+        entry = _templates.get(key)
+        if entry is None or entry[0] != mtime:
+            entry = (mtime, compile_template(path, sheet_name))
+            _templates[key] = entry
+        return entry[1]
+
+
+def _xf_with_alignment(xf, alignment):
+    """Copy of a cellXfs entry with its alignment replaced (what setting cell.alignment does)."""
+    attrs = dict(_ATTR_RE.findall(xf[:xf.index('>')]))
+    attrs["applyAlignment"] = "1"
+    body = "" if xf.endswith("/>") else xf[xf.index('>') + 1:xf.rindex("</xf>")]
+    body = re.sub(r'<alignment\b[^>]*?/>|<alignment\b[^>]*?>.*?</alignment>', '', body, flags=re.S)
+    align = "".join(f' {k}="{escape(v)}"' for k, v in dict(alignment).items())
+    head = "".join(f' {k}="{escape(v)}"' for k, v in attrs.items())
+    return f"<xf{head}><alignment{align}/>{body}</xf>"
+
+
+def _string_xml(text):
+    if ILLEGAL_CHARACTERS_RE.search(text):
+        raise IllegalCharacterError(f"{text} cannot be used in worksheets.")
+    return f'<si><t xml:space="preserve">{escape(text)}</t></si>'
+
+
+def patch_calendar(pivot_df, layout, start_date, path=TEMPLATE_PATH, sheet_name="Template"):
+    """
+    Render the training calendar by patching the template package.
+    Same cells, values and alignments as fill_template on a new_workbook.
+    :return: (BytesIO with the .xlsx, layout entries without data in the pivot)
+    """
+    compiled = _template(path, sheet_name)
+    cells, missing = calendar_cells(pivot_df, layout)
+    cells = header_cells(start_date) + cells
+
+    pieces = list(compiled.sheet_pieces)
+    strings = {}                     # new text -> index, appended after the template's strings
+    new_xfs = {}                     # (template style, id(alignment)) -> new style index
+    extra_xfs = []
+    string_refs = 0
+    for row_num, col_idx, value, alignment in cells:
+        ref = f"{get_column_letter(col_idx)}{row_num}"
+        if ref in compiled.covered:
+            raise ValueError(f"Cell {ref} is part of a merged range and cannot be written.")
+        if ref not in compiled.cell_slots:
+            raise ValueError(f"Cell {ref} is not in the template sheet; use the openpyxl writer.")
+        slot, style, had_string = compiled.cell_slots[ref]
+        string_refs -= had_string
+
+        key = (style, id(alignment))
+        if key not in new_xfs:
+            new_xfs[key] = len(compiled.xfs) + len(extra_xfs)
+            extra_xfs.append(_xf_with_alignment(compiled.xfs[style], alignment))
+
+        if value is None or value == "" or (isinstance(value, float) and value != value):
+            # openpyxl writes None and "" alike: a styled cell without a value.
+            pieces[slot] = f'<c r="{ref}" s="{new_xfs[key]}"/>'
+        elif isinstance(value, bool):
+            pieces[slot] = f'<c r="{ref}" s="{new_xfs[key]}" t="b"><v>{int(value)}</v></c>'
+        elif isinstance(value, (int, float)):
+            pieces[slot] = f'<c r="{ref}" s="{new_xfs[key]}"><v>{value!r}</v></c>'
+        else:
+            text = str(value)
+            index = compiled.string_index.get(text)
+            if index is None:
+                index = strings.setdefault(text, len(compiled.strings) + len(strings))
+            pieces[slot] = f'<c r="{ref}" s="{new_xfs[key]}" t="s"><v>{index}</v></c>'
+            string_refs += 1
+
+    unique = len(compiled.strings) + len(strings)
+    sst_head = _SST_COUNTS_RE.sub(
+        lambda m: re.sub(r'\s(count|uniqueCount)="\d+"', '', m.group(0)[:-1])
+        + f' count="{compiled.sst_count + string_refs}" uniqueCount="{unique}">',
+        compiled.sst_head, count=1,
+    )
+    sst_xml = sst_head + "".join(_string_xml(text) for text in strings) + "</sst>"
+    styles_xml = (
+        compiled.styles_head
+        + f'<cellXfs count="{len(compiled.xfs) + len(extra_xfs)}">'
+        + "".join(compiled.xfs) + "".join(extra_xfs) + "</cellXfs>"
+        + compiled.styles_tail
+    )
+    patched = {
+        compiled.sheet_part: "".join(pieces).encode("utf-8"),
+        compiled.strings_part: sst_xml.encode("utf-8"),
+        compiled.styles_part: styles_xml.encode("utf-8"),
+    }
+
+    output = BytesIO()
+    with zipfile.ZipFile(output, "w") as package:
+        for info in compiled.infos:
+            # Fresh ZipInfo per render: writestr fills in sizes and offsets on it.
+            entry = zipfile.ZipInfo(info.filename, info.date_time)
+            entry.compress_type = info.compress_type
+            entry.external_attr = info.external_attr
+            package.writestr(entry, patched.get(info.filename, compiled.parts[info.filename]))
+    output.seek(0)
+    return output, missing
+
+
+# ----------------------------------------
+# Equivalence with the openpyxl writer
+STYLE_ATTRIBUTES = ['font', 'border', 'fill', 'alignment', 'number_format', 'protection']
+
+
+def compare_workbooks(first, second):
+    """
+    Cell-by-cell differences between two .xlsx files (paths or file objects), as read by openpyxl.
+    :return: list of 'Sheet!A1: what differs' strings (empty when equivalent)
+    """
+    from openpyxl import load_workbook
+
+    a, b = load_workbook(first), load_workbook(second)
+    differences = []
+    if a.sheetnames != b.sheetnames:
+        return [f"sheet names {a.sheetnames} != {b.sheetnames}"]
+    for ws_a, ws_b in zip(a.worksheets, b.worksheets):
+        if set(map(str, ws_a.merged_cells.ranges)) != set(map(str, ws_b.merged_cells.ranges)):
+            differences.append(f"{ws_a.title}: merged ranges differ")
+        rows = max(ws_a.max_row, ws_b.max_row)
+        cols = max(ws_a.max_column, ws_b.max_column)
+        for row in range(1, rows + 1):
+            for col in range(1, cols + 1):
+                x, y = ws_a.cell(row, col), ws_b.cell(row, col)
+                where = f"{ws_a.title}!{x.coordinate}"
+                if x.value != y.value:
+                    differences.append(f"{where}: value {x.value!r} != {y.value!r}")
+                for attr in STYLE_ATTRIBUTES:
+                    if repr(getattr(x, attr)) != repr(getattr(y, attr)):
+                        differences.append(f"{where}: {attr} differs")
+    return differences
+
+
+def check_equivalence(pivot_df, layout, start_date, path=TEMPLATE_PATH):
+    """Render one week with both writers and return compare_workbooks' differences."""
+    from trainingplan.template import fill_template, new_workbook, workbook_bytes
+
+    workbook = new_workbook(path)
+    fill_template(workbook, pivot_df, layout, start_date)
+    patched, _ = patch_calendar(pivot_df, layout, start_date, path)
+    return compare_workbooks(workbook_bytes(workbook), patched)
+
+
+def synthetic_week(path=TEMPLATE_PATH):
+    """Layout over every writable calendar row of the template and a pivot covering most of it."""
+    import pandas as pd
+    from trainingplan.sessions import DAY_ORDER
+
+    compiled = _template(path, "Template")
+    writable = [
+        row for row in range(6, 107)
+        if all(f"{get_column_letter(col)}{row}" in compiled.cell_slots
+               and f"{get_column_letter(col)}{row}" not in compiled.covered
+               for col in range(3, 3 + len(DAY_ORDER)))
+        and not compiled.cell_slots[f"C{row}"][2]
+    ]
+    layout = [
+        {"sport": f"Sport {row}", "training_group": f"Group {row}", "start_cell": f"C{row}"}
+        for row in writable
+    ]
+    rows = [
+        [entry["sport"], entry["training_group"]]
+        + [f"Venue {i % 7}\n{6 + i % 12:02d}:00-{7 + i % 12:02d}:30" if (i + j) % 3 else ('' if j % 2 else ' ')
+           for j in range(len(DAY_ORDER))]
+        for i, entry in enumerate(layout) if i % 5
+    ]
+    return pd.DataFrame(rows, columns=['Sport', 'Training_Group'] + DAY_ORDER), layout
+
+
+if __name__ == "__main__":
+    import time
+    from datetime import date
+
+    from trainingplan.template import fill_template, new_workbook, workbook_bytes
+
+    pivot_df, layout = synthetic_week()
+    week = date(2025, 2, 9)
+    new_workbook(), patch_calendar(pivot_df, layout, week)  # warm both template caches
+
+    started = time.perf_counter()
+    workbook = new_workbook()
+    fill_template(workbook, pivot_df, layout, week)
+    reference = workbook_bytes(workbook)
+    openpyxl_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    patched, _ = patch_calendar(pivot_df, layout, week)
+    patch_seconds = time.perf_counter() - started
+
+    differences = compare_workbooks(reference, patched)
+    print(f"openpyxl: {openpyxl_seconds * 1000:.1f} ms, patched: {patch_seconds * 1000:.1f} ms "
+          f"({len(layout)} layout rows)")
+    print("\n".join(differences[:20]) if differences else "Outputs are equivalent.")
+    raise SystemExit(1 if differences else 0)